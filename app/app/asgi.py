@@ -7,10 +7,80 @@ For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
-from django.core.asgi import get_asgi_application
+from asgiref.sync import sync_to_async
+
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGI handler bounding concurrent views and streaming in their thread
+
+    Each view runs in a thread with its own database connection, so the
+    requests past the body read are limited to ASGI_MAX_CONCURRENT_REQUESTS
+    per worker, the others wait in the event loop.  Django 4.0 iterates
+    streaming responses in the event loop, where the database queries of
+    the recipe export are not allowed and would block the other requests.
+    """
+    _slots = None
+
+    @property
+    def slots(self):
+        """Return the semaphore bounding concurrent views"""
+        # Created on first use, in the worker's event loop.
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(
+                settings.ASGI_MAX_CONCURRENT_REQUESTS
+            )
+
+        return self._slots
+
+    async def get_response_async(self, request):
+        async with self.slots:
+            return await super().get_response_async(request)
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+
+        # Same thread as the view, so the export uses its connection.
+        next_part = sync_to_async(next, thread_sensitive=True)
+        parts = iter(response)
+        async with self.slots:
+            while (part := await next_part(parts, None)) is not None:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+        await send({'type': 'http.response.body'})
+
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
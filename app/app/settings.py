@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,16 +88,76 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse.  DB_POOL_SIZE > 0 instead shares a pool of that many connections
+# between the threads of each worker, which suits ASGI where each request
+# runs in its own thread.  DB_PGBOUNCER=1 is for a pgbouncer in transaction
+# pooling mode, which cannot keep the server-side cursors of the export
+# open, so it is read a page per query instead.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0 if DB_POOL_SIZE else int(
+            os.environ.get('DB_CONN_MAX_AGE', 60)
+        ),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'POOL_SIZE': DB_POOL_SIZE,
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_PGBOUNCER', 0))
+        ),
     }
 }
 
+# The default cache, configured with CACHE_BACKEND and CACHE_LOCATION, e.g.
+# django.core.cache.backends.redis.RedisCache and redis://cache:6379, or
+# django.core.cache.backends.db.DatabaseCache and the name of a table made
+# by createcachetable.  The default LocMemCache is not shared by workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND') or (
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
+}
+
+# Comma separated host[:port] of read replicas of the default database.  The
+# reads of GET, HEAD and OPTIONS requests go to a healthy replica, except for
+# users who wrote in the last REPLICA_STICKY_SECONDS, whose reads stay on the
+# primary.  A replica that cannot be reached is skipped for
+# REPLICA_RETRY_SECONDS.  Writers are remembered in this cache from CACHES,
+# which must be shared between workers: with a per-process cache, reads stay
+# on the primary and the check framework warns.
+DATABASE_REPLICAS = []
+for number, address in enumerate(filter(None, map(
+    str.strip, os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+)), 1):
+    host, _, port = address.partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+REPLICA_RETRY_SECONDS = int(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+REPLICA_STICKY_CACHE_ALIAS = os.environ.get(
+    'REPLICA_STICKY_CACHE_ALIAS', 'default'
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +201,39 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = 'vol/web/media'
 STATIC_ROOT = 'vol/web/static'
 
+# Threads per worker resizing uploaded recipe images; 0 resizes inline.
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+
+# Limits for chunked image uploads, in bytes. Chunks must also fit within
+# the proxy's client_max_body_size.
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_MAX_SIZE', 50 * 1024 * 1024)
+)
+RECIPE_IMAGE_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_IMAGE_CHUNK_SIZE', 5 * 1024 * 1024)
+)
+# Seconds after which the clean_image_uploads command deletes unfinished
+# uploads and their partial files, run it periodically.
+RECIPE_IMAGE_UPLOAD_MAX_AGE = int(
+    os.environ.get('RECIPE_IMAGE_UPLOAD_MAX_AGE', 24 * 60 * 60)
+)
+
+# Most recipes created, updated and deleted by one bulk request, and rows
+# written per insert or update statement.
+RECIPE_BULK_MAX_ITEMS = int(os.environ.get('RECIPE_BULK_MAX_ITEMS', 10000))
+RECIPE_BULK_BATCH_SIZE = int(os.environ.get('RECIPE_BULK_BATCH_SIZE', 1000))
+
+# Recipes read from the database cursor at a time by exports.
+RECIPE_EXPORT_CHUNK_SIZE = int(
+    os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 500)
+)
+
+# Requests each ASGI worker runs views for at once. Each holds a database
+# connection, so workers times this must stay below max_connections.
+ASGI_MAX_CONCURRENT_REQUESTS = int(
+    os.environ.get('ASGI_MAX_CONCURRENT_REQUESTS', 10)
+)
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -149,8 +244,73 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'TEST_REQUEST_RENDERER_CLASSES': [
+        'rest_framework.renderers.MultiPartRenderer',
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
 }
 
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Token lookups are cached per worker, and optionally in a shared cache
+# from CACHES, for TOKEN_CACHE_TIMEOUT seconds.  Workers see deleted tokens
+# and deactivated users through the shared cache at once.  Without it they
+# only see them when their own entries expire, so the default is short.
+# Set TOKEN_CACHE_ALIAS=default once CACHE_BACKEND names a shared cache;
+# it only holds token keys and user ids, never the users themselves.
+TOKEN_CACHE_MAX_SIZE = int(os.environ.get('TOKEN_CACHE_MAX_SIZE', 10000))
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+TOKEN_CACHE_TIMEOUT = int(os.environ.get(
+    'TOKEN_CACHE_TIMEOUT', 60 if TOKEN_CACHE_ALIAS else 5
+))
+
+# Recipe, tag and ingredient responses are cached in this cache from CACHES
+# for RESPONSE_CACHE_TIMEOUT seconds, 0 disables the response cache.
+RESPONSE_CACHE_ALIAS = os.environ.get('RESPONSE_CACHE_ALIAS', 'default')
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Tag and ingredient autocompletion is served from a per-process cache of
+# the names of up to AUTOCOMPLETE_CACHE_USERS users, 0 always queries the
+# database.  Users with more than AUTOCOMPLETE_CACHE_MAX_NAMES names are not
+# cached.
+AUTOCOMPLETE_CACHE_USERS = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_USERS', 1000)
+)
+AUTOCOMPLETE_CACHE_MAX_NAMES = int(
+    os.environ.get('AUTOCOMPLETE_CACHE_MAX_NAMES', 5000)
+)
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Similar recipes are found from MinHash signatures of SIMILARITY_NUM_HASHES
+# hashes, kept per process for up to SIMILARITY_CACHE_USERS users (about
+# 4 bytes per hash per recipe).  Refreshes reread the recipes modified up to
+# SIMILARITY_REFRESH_MARGIN seconds before the newest one seen, so changes
+# committed late are not missed.
+SIMILARITY_NUM_HASHES = int(os.environ.get('SIMILARITY_NUM_HASHES', 64))
+SIMILARITY_CACHE_USERS = int(os.environ.get('SIMILARITY_CACHE_USERS', 50))
+SIMILARITY_REFRESH_MARGIN = 60
+SIMILARITY_MAX_LIMIT = 50
+
+# Recipe facets split time_minutes and price into buckets at these bounds,
+# and list at most RECIPE_FACET_MAX_VALUES tags and ingredients.
+RECIPE_FACET_TIME_BOUNDS = [15, 30, 60]
+RECIPE_FACET_PRICE_BOUNDS = ['5.00', '10.00', '20.00']
+RECIPE_FACET_MAX_VALUES = 100
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
@@ -22,6 +22,11 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import (
+    CacheStatsView,
+    DatabaseStatsView,
+)
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
@@ -29,6 +34,8 @@ urlpatterns = [
          name='api-docs'),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/stats/db/', DatabaseStatsView.as_view(), name='db-stats'),
+    path('api/stats/cache/', CacheStatsView.as_view(), name='cache-stats'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,30 @@
+"""
+System checks for the core app.
+"""
+from django.conf import settings
+from django.core.checks import (
+    register,
+    Tags,
+    Warning,
+)
+
+from core.db import routers
+
+
+@register(Tags.database, Tags.caches)
+def check_replica_sticky_cache(app_configs, **kwargs):
+    """Warn when replicas are configured without a shared sticky cache."""
+    if not settings.DATABASE_REPLICAS or routers.sticky_cache_shared():
+        return []
+
+    return [
+        Warning(
+            'Reads are not routed to the replicas, as the cache '
+            f'"{settings.REPLICA_STICKY_CACHE_ALIAS}" is not shared by the '
+            'workers, so they could not keep the reads of a user who wrote '
+            'on the primary.',
+            hint='Set CACHE_BACKEND and CACHE_LOCATION, or '
+                 'REPLICA_STICKY_CACHE_ALIAS, to a shared cache.',
+            id='core.W001',
+        ),
+    ]
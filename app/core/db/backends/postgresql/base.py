@@ -0,0 +1,102 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+"""
+import functools
+import os
+import threading
+
+from django.db.backends.postgresql import base
+
+from core.db.pool import ConnectionPool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection that checks persistent connections before use.
+
+    With ``CONN_HEALTH_CHECKS``, a persistent connection is tested with a
+    cheap query the first time it is used in a request and replaced if the
+    server went away, as Django 4.1 does.  With ``POOL_SIZE``, connections
+    are taken from and returned to a pool shared by the threads of the
+    process instead of being opened and closed.
+    """
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool(self):
+        """Return the connection pool of this process, if pooling is on"""
+        size = self.settings_dict.get('POOL_SIZE') or 0
+        if size <= 0:
+            return None
+
+        # Keyed by process, as forked workers must not share connections.
+        key = (os.getpid(), self.alias, self.settings_dict['NAME'])
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = ConnectionPool(
+                    functools.partial(
+                        super().get_new_connection,
+                        self.get_connection_params(),
+                    ),
+                    max_size=size,
+                    timeout=self.settings_dict.get('POOL_TIMEOUT', 10),
+                )
+
+            return self._pools[key]
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        return pool.acquire()
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            pool.release(self.connection)
+
+    def connect(self):
+        # A new connection is known to work, and must not be checked while
+        # connect() sets it up.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it no longer works, once per request"""
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Called at the start and end of each request.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def pool_stats(self):
+        """Return the statistics of this process's pool, if pooling is on"""
+        pool = self.pool
+        return pool.stats() if pool is not None else None
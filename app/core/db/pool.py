@@ -0,0 +1,131 @@
+"""
+In-process pool of database connections.
+"""
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection was returned to the pool within the timeout."""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are opened on demand up to ``max_size``, after which callers
+    wait up to ``timeout`` seconds for one to be released.  Wait counts and
+    times are kept so operators can tell when the pool is too small.
+    """
+
+    def __init__(self, connect, max_size, timeout):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the acquisition and wait counters."""
+        with self._condition:
+            self.acquired = 0
+            self.waits = 0
+            self.timeouts = 0
+            self.wait_time = 0.0
+            self.max_wait_time = 0.0
+
+    def acquire(self):
+        """Return an idle connection, opening or waiting for one if needed."""
+        start = time.monotonic()
+        waited = False
+
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection = self._idle.pop()
+                    if connection.closed:
+                        self._size -= 1
+                        continue
+                    break
+                if self._size < self.max_size:
+                    connection = None
+                    self._size += 1
+                    break
+
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No connection available within {self.timeout}s.'
+                    )
+                waited = True
+                self._condition.wait(remaining)
+
+            elapsed = time.monotonic() - start
+            self.acquired += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+        if connection is None:
+            try:
+                connection = self.connect()
+            except Exception:
+                self._discard()
+                raise
+
+        return connection
+
+    def release(self, connection):
+        """Return a connection to the pool, or drop it if it is broken."""
+        if not connection.closed:
+            try:
+                # A connection released mid-transaction must not leak its
+                # state to the next user.
+                status = connection.info.transaction_status
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except Exception:
+                connection.close()
+
+        if connection.closed:
+            self._discard()
+            return
+
+        with self._condition:
+            self._idle.append(connection)
+            self._condition.notify()
+
+    def _discard(self):
+        """Forget a connection that was closed or failed to open."""
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close the idle connections, those in use are closed on release."""
+        with self._condition:
+            while self._idle:
+                self._idle.pop().close()
+                self._size -= 1
+
+    def stats(self):
+        """Return the size of the pool and how long callers waited."""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'acquired': self.acquired,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_time': self.wait_time,
+                'max_wait_time': self.max_wait_time,
+            }
@@ -0,0 +1,151 @@
+"""
+Database router sending the reads of safe requests to replicas.
+"""
+import random
+import time
+
+from asgiref.local import Local
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import (
+    connections,
+    DatabaseError,
+    DEFAULT_DB_ALIAS,
+)
+
+
+# Read from the primary, as replication lag would fail fresh logins.
+PRIMARY_APP_LABELS = {'admin', 'auth', 'authtoken', 'contenttypes', 'sessions'}
+
+# The request whose reads may use a replica, per thread or coroutine.
+_state = Local()
+# Time until which each unreachable replica is skipped, per process.
+_unhealthy_until = {}
+
+
+def sticky_cache_shared():
+    """Return whether every worker sees the writers in the sticky cache."""
+    return not isinstance(
+        caches[settings.REPLICA_STICKY_CACHE_ALIAS],
+        (DummyCache, LocMemCache),
+    )
+
+
+def sticky_key(user_id):
+    """Return the cache key marking a user's recent write."""
+    return f'replica-sticky:{user_id}'
+
+
+def stick_to_primary(user):
+    """Keep the user's reads on the primary while replicas catch up."""
+    caches[settings.REPLICA_STICKY_CACHE_ALIAS].set(
+        sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def is_sticky(user):
+    """Return whether the user wrote in the last few seconds."""
+    if user is None or not user.is_authenticated:
+        return False
+
+    return caches[settings.REPLICA_STICKY_CACHE_ALIAS].get(
+        sticky_key(user.pk), False
+    )
+
+
+def is_healthy(alias):
+    """Return whether a replica accepts connections and queries."""
+    if _unhealthy_until.get(alias, 0) > time.monotonic():
+        return False
+
+    connection = connections[alias]
+    try:
+        # A persistent connection may have died since the last request.
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+        connection.ensure_connection()
+    except DatabaseError:
+        _unhealthy_until[alias] = (
+            time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        )
+        return False
+
+    _unhealthy_until.pop(alias, None)
+    return True
+
+
+def choose_replica(request):
+    """Return a healthy replica for the request, or the primary."""
+    # Without a shared cache, the other workers would not know who wrote
+    # and could serve stale reads right after a write.
+    if not sticky_cache_shared():
+        return DEFAULT_DB_ALIAS
+    if is_sticky(getattr(request, 'user', None)):
+        return DEFAULT_DB_ALIAS
+
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)
+    ]
+
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+class replica_reads:
+    """Let the reads made while handling a safe request use a replica."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def __enter__(self):
+        _state.request = self.request
+        _state.alias = None
+
+    def __exit__(self, *exc_info):
+        del _state.request, _state.alias
+
+
+class ReplicaRouter:
+    """Route reads to replicas and writes to the primary.
+
+    Outside of ``replica_reads`` everything uses the primary.  Inside, the
+    first read picks a replica that every later read of the request uses,
+    unless the request or a recent one from the same user wrote.
+    """
+
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'request', None) is None:
+            return None
+        if (
+            model._meta.app_label in PRIMARY_APP_LABELS
+            or model._meta.label == settings.AUTH_USER_MODEL
+        ):
+            return DEFAULT_DB_ALIAS
+
+        if _state.alias is None:
+            _state.alias = choose_replica(_state.request)
+
+        return _state.alias
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'request', None) is not None:
+            # Read what this request wrote from where it was written.
+            _state.alias = DEFAULT_DB_ALIAS
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas receive the schema from the primary.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+
+        return None
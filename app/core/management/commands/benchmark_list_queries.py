@@ -0,0 +1,263 @@
+"""
+Django command to show the query plans of the API list queries.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import (
+    connection,
+    transaction,
+)
+from django.test import RequestFactory
+
+from rest_framework.request import Request
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+from recipe.views import (
+    IngredientViewSet,
+    RecipeViewSet,
+    TagViewSet,
+)
+
+
+EMAIL_PATTERN = 'benchmark-{}@example.com'
+
+# Indexes added for the list queries, dropped with --without-indexes.
+LIST_INDEXES = [
+    'recipe_user_id_idx',
+    'tag_user_name_id_idx',
+    'ingredient_user_name_id_idx',
+    'tag_user_usage_idx',
+    'ingredient_user_usage_idx',
+    'recipe_tags_tag_recipe_idx',
+    'recipe_ingredients_ingredient_recipe_idx',
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    """Django command to seed benchmark data and explain list queries."""
+
+    help = (
+        'Seed benchmark users with recipes, tags and ingredients and print '
+        'the plans of the queries behind the list endpoints.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument(
+            '--without-indexes',
+            action='store_true',
+            help='Also explain the queries with the list indexes dropped.',
+        )
+        parser.add_argument(
+            '--no-seed',
+            action='store_true',
+            help='Reuse previously seeded benchmark data.',
+        )
+        parser.add_argument(
+            '--clean',
+            action='store_true',
+            help='Delete the benchmark users and their data, then exit.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for the command."""
+        users = get_user_model().objects.filter(
+            email__startswith='benchmark-', email__endswith='@example.com'
+        )
+
+        if options['clean']:
+            self.clear(users)
+            self.stdout.write(self.style.SUCCESS('Benchmark data deleted.'))
+            return
+
+        if not options['no_seed']:
+            self.clear(users)
+            self.seed(options['users'], options['recipes'])
+
+        user = users.order_by('id').first()
+        if user is None:
+            self.stderr.write('No benchmark data, run without --no-seed.')
+            return
+
+        queries = self.list_queries(user, options['page_size'])
+        self.explain(queries, 'With list indexes')
+
+        if options['without_indexes']:
+            # DROP INDEX is transactional, so the indexes come back on
+            # rollback; it does lock the tables until then.
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        for name in LIST_INDEXES:
+                            cursor.execute(f'DROP INDEX IF EXISTS {name}')
+                    self.explain(queries, 'Without list indexes')
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+    def clear(self, users):
+        """Delete the benchmark users and everything they own."""
+        user_ids = list(users.values_list('id', flat=True))
+
+        # Deleting in SQL skips loading every cascaded row into Python.
+        with transaction.atomic(), connection.cursor() as cursor:
+            for field in ('tags', 'ingredients'):
+                through = Recipe._meta.get_field(field).remote_field.through
+                cursor.execute(
+                    f'DELETE FROM {through._meta.db_table} WHERE recipe_id '
+                    'IN (SELECT id FROM core_recipe WHERE user_id = ANY(%s))',
+                    [user_ids],
+                )
+            for model in (Recipe, Tag, Ingredient):
+                cursor.execute(
+                    f'DELETE FROM {model._meta.db_table} '
+                    'WHERE user_id = ANY(%s)',
+                    [user_ids],
+                )
+            users.delete()
+
+    def seed(self, user_count, recipe_count):
+        """Insert benchmark rows in bulk with set based SQL."""
+        start = time.monotonic()
+        user_ids = [
+            get_user_model().objects.create_user(
+                email=EMAIL_PATTERN.format(number)
+            ).id
+            for number in range(user_count)
+        ]
+        # Foreign key checks plan against the current statistics and run
+        # once per inserted row, so keep the statistics of the referenced
+        # tables current or every check scans the whole table.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'VACUUM ANALYZE {get_user_model()._meta.db_table}'
+            )
+
+        attr_count = max(recipe_count // 10, user_count)
+        attr_count -= attr_count % user_count
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO core_recipe (
+                    user_id, title, description, time_minutes, price, link,
+                    image_derivatives, version, modified
+                )
+                SELECT (%(users)s::int[])[1 + n %% %(user_count)s],
+                       'Recipe ' || n, '', 1 + n %% 120,
+                       (n %% 10000) / 100.0, '', '{}', 1, now()
+                FROM generate_series(0, %(count)s - 1) AS n
+                """,
+                {
+                    'users': user_ids,
+                    'user_count': user_count,
+                    'count': recipe_count,
+                },
+            )
+            cursor.execute('ANALYZE core_recipe')
+            first_recipe_id = self.first_id(cursor, 'core_recipe', user_ids)
+            for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+                self.seed_attrs(
+                    cursor, model, field, user_ids, attr_count,
+                    first_recipe_id,
+                )
+
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM ANALYZE')
+
+        self.stdout.write(
+            f'Seeded {recipe_count} recipes for {user_count} users '
+            f'in {time.monotonic() - start:.1f}s.'
+        )
+
+    def first_id(self, cursor, table, user_ids):
+        """Return the lowest id of the benchmark rows in a table."""
+        cursor.execute(
+            f'SELECT min(id) FROM {table} WHERE user_id = ANY(%s)',
+            [user_ids],
+        )
+        return cursor.fetchone()[0]
+
+    def seed_attrs(
+        self, cursor, model, field, user_ids, count, first_recipe_id
+    ):
+        """Insert tags or ingredients and link each recipe to one."""
+        table = model._meta.db_table
+        through = Recipe._meta.get_field(field).remote_field.through
+        column = through._meta.get_field(model._meta.model_name).column
+
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, name, usage_count)
+            SELECT (%(users)s::int[])[1 + n %% %(user_count)s],
+                   '{model.__name__} ' || n, 0
+            FROM generate_series(0, %(count)s - 1) AS n
+            """,
+            {'users': user_ids, 'user_count': len(user_ids), 'count': count},
+        )
+        cursor.execute(f'ANALYZE {table}')
+        # Rows inserted by one statement get consecutive ids, so offsetting
+        # from the first ids pairs each recipe with an attribute of the same
+        # user, as count is a multiple of the users.
+        cursor.execute(
+            f"""
+            INSERT INTO {through._meta.db_table} (recipe_id, {column})
+            SELECT id, %(first_attr)s + (id - %(first_recipe)s) %% %(count)s
+            FROM core_recipe
+            WHERE id >= %(first_recipe)s
+            """,
+            {
+                'first_attr': self.first_id(cursor, table, user_ids),
+                'first_recipe': first_recipe_id,
+                'count': count,
+            },
+        )
+
+    def list_queries(self, user, page_size):
+        """Return the first page queries of the list endpoints."""
+        limit = page_size + 1
+        tag = Tag.objects.filter(user=user).first()
+        endpoints = {
+            'recipe-list': (RecipeViewSet, {}),
+            'recipe-list?tags': (RecipeViewSet, {'tags': tag.id}),
+            'tag-list': (TagViewSet, {}),
+            'tag-list?assigned_only': (TagViewSet, {'assigned_only': 1}),
+            'tag-list?ordering=usage': (TagViewSet, {'ordering': 'usage'}),
+            'ingredient-list': (IngredientViewSet, {}),
+        }
+
+        return {
+            name: self.list_queryset(viewset, user, params)[:limit]
+            for name, (viewset, params) in endpoints.items()
+        }
+
+    def list_queryset(self, viewset, user, params):
+        """Return the queryset a list endpoint builds for the parameters."""
+        # Built by the views themselves so the plans follow their changes.
+        request = Request(RequestFactory().get('/', params))
+        request.user = user
+        view = viewset(
+            request=request, action='list', format_kwarg=None, kwargs={}
+        )
+
+        return view.get_queryset()
+
+    def explain(self, queries, heading):
+        """Print the executed plan of each query."""
+        self.stdout.write(self.style.MIGRATE_HEADING(heading))
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_LABEL(name))
+            self.stdout.write(queryset.explain(analyze=True, buffers=True))
+            self.stdout.write('')
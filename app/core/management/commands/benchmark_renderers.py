@@ -0,0 +1,100 @@
+"""
+Django command to compare the size and CPU cost of each wire format.
+"""
+import io
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from core.parsers import (
+    MessagePackParser,
+    ORJSONParser,
+)
+from core.renderers import (
+    MessagePackRenderer,
+    ORJSONRenderer,
+)
+
+
+FORMATS = [
+    ('json (DRF)', JSONRenderer, JSONParser),
+    ('json (orjson)', ORJSONRenderer, ORJSONParser),
+    ('msgpack', MessagePackRenderer, MessagePackParser),
+]
+
+
+def recipe_page(size, tags, ingredients):
+    """Return a recipe list page shaped like the serializer output."""
+    # The serializer renders prices as strings, as COERCE_DECIMAL_TO_STRING
+    # is on by default.
+    results = ReturnList(serializer=None)
+
+    for number in range(size):
+        results.append(OrderedDict([
+            ('id', number),
+            ('title', f'Recipe number {number}'),
+            ('time_minutes', 10 + number % 50),
+            ('price', str(Decimal(number % 10000) / 100)),
+            ('link', f'https://example.com/recipes/{number}'),
+            ('tags', [
+                OrderedDict([('id', tag), ('name', f'Tag {tag}')])
+                for tag in range(tags)
+            ]),
+            ('ingredients', [
+                OrderedDict([('id', item), ('name', f'Ingredient {item}')])
+                for item in range(ingredients)
+            ]),
+        ]))
+
+    return OrderedDict([
+        ('next', 'https://example.com/api/recipe/recipes/?cursor=abc'),
+        ('previous', None),
+        ('results', results),
+    ])
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the API renderers and parsers."""
+
+    help = 'Compare bytes and CPU time per response for each wire format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--tags', type=int, default=5)
+        parser.add_argument('--ingredients', type=int, default=10)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        """Entry point for the command."""
+        data = recipe_page(
+            options['page_size'], options['tags'], options['ingredients']
+        )
+        iterations = options['iterations']
+
+        self.stdout.write(
+            f'{"format":<16}{"bytes":>10}{"render ms":>12}{"parse ms":>12}'
+        )
+        for name, renderer_class, parser_class in FORMATS:
+            renderer = renderer_class()
+            parser = parser_class()
+
+            start = time.process_time()
+            for _ in range(iterations):
+                content = renderer.render(data)
+            render_time = (time.process_time() - start) / iterations
+
+            start = time.process_time()
+            for _ in range(iterations):
+                parser.parse(io.BytesIO(content))
+            parse_time = (time.process_time() - start) / iterations
+
+            self.stdout.write(
+                f'{name:<16}{len(content):>10}'
+                f'{render_time * 1000:>12.3f}{parse_time * 1000:>12.3f}'
+            )
@@ -0,0 +1,47 @@
+"""
+Django command to delete abandoned chunked image uploads.
+"""
+import contextlib
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipe import uploads
+
+
+class Command(BaseCommand):
+    """Django command to expire unfinished recipe image uploads."""
+
+    help = (
+        'Delete chunked image uploads started longer ago than the maximum '
+        'age, with their partial files, and partial files left behind by '
+        'deleted recipes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=settings.RECIPE_IMAGE_UPLOAD_MAX_AGE,
+            help='Seconds, defaults to RECIPE_IMAGE_UPLOAD_MAX_AGE.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for the command."""
+        max_age = options['max_age']
+        expired = 0
+        for upload in uploads.expired_uploads(max_age).iterator():
+            uploads.discard(upload)
+            expired += 1
+
+        orphaned = uploads.orphaned_partial_files(max_age)
+        for path in orphaned:
+            # Ignore files removed since the directory was read.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {expired} expired uploads and {len(orphaned)} '
+            'orphaned partial files.'
+        ))
@@ -0,0 +1,317 @@
+"""
+Django command to import recipes from a JSON lines or CSV file.
+"""
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+from django.db import (
+    connection,
+    transaction,
+)
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    RecipeImportCheckpoint,
+    Tag,
+)
+from core.signals import recipes_bulk_changed
+from recipe.export import CSV_NAME_SEPARATOR
+from recipe.serializers import get_or_create_attrs
+
+
+# Recipe fields read from each record, the others keep their defaults.
+RECIPE_FIELDS = ('title', 'description', 'time_minutes', 'price', 'link')
+ATTR_MODELS = {
+    'tags': Tag,
+    'ingredients': Ingredient,
+}
+
+
+def read_ndjson(file):
+    """Yield each non-blank line, parsed later so bad ones are skipped."""
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def parse_ndjson(line):
+    """Return the record of a line of JSON."""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError('Record is not a JSON object.')
+
+    return record
+
+
+def read_csv(file):
+    """Yield each CSV row, as written by the recipe export."""
+    return csv.DictReader(file)
+
+
+def parse_csv(row):
+    """Return the record of a CSV row, splitting the names of its links."""
+    for name in ATTR_MODELS:
+        row[name] = (row.get(name) or '').split(CSV_NAME_SEPARATOR)
+
+    return row
+
+
+def attr_name(item):
+    """Return a tag or ingredient name, given as a string or object."""
+    if isinstance(item, dict):
+        item = item.get('name')
+    if not isinstance(item, str):
+        raise TypeError('Tag and ingredient names must be strings.')
+
+    return item.strip()
+
+
+# Reader of the raw records and parser of each record, by file format.
+READERS = {
+    'ndjson': (read_ndjson, parse_ndjson),
+    'csv': (read_csv, parse_csv),
+}
+
+
+class Command(BaseCommand):
+    """Django command to import recipes for a user in batches."""
+
+    help = (
+        'Import recipes, with their tags and ingredients, for a user from a '
+        'JSON lines or CSV file in the format of the recipe export.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Owner email.')
+        parser.add_argument(
+            '--file-format',
+            choices=list(READERS),
+            help='Defaults to the file extension.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Write with COPY rather than INSERT statements.',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and import from the start.',
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for the command."""
+        path = os.path.abspath(options['path'])
+        file_format = options['file_format'] or (
+            os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(f'Unknown file format "{file_format}".')
+
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email "{options["user"]}".')
+
+        checkpoints = RecipeImportCheckpoint.objects.filter(
+            user=user, path=path
+        )
+        if options['restart']:
+            checkpoints.delete()
+        done = checkpoints.values_list('records', flat=True).first() or 0
+        if done:
+            self.stdout.write(f'Resuming after {done} records.')
+
+        self.attr_ids = {name: {} for name in ATTR_MODELS}
+        write_batch = self.copy_batch if options['copy'] else self.insert_batch
+        imported = skipped = 0
+        start = time.monotonic()
+
+        read, parse = READERS[file_format]
+        with open(path, newline='', encoding='utf-8') as file:
+            records = read(file)
+            # Records before the checkpoint were committed by an earlier run.
+            for _ in islice(records, done):
+                pass
+
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+
+                recipes = []
+                for number, record in enumerate(batch, done + 1):
+                    try:
+                        recipes.append(
+                            self.build_recipe(user, parse(record))
+                        )
+                    except (ValidationError, TypeError, ValueError) as exc:
+                        skipped += 1
+                        self.stderr.write(f'Skipped record {number}: {exc}')
+
+                done += len(batch)
+                # Committed with the batch, so an interrupted import resumes
+                # right after the last batch written.
+                with transaction.atomic():
+                    write_batch(user, recipes)
+                    RecipeImportCheckpoint.objects.update_or_create(
+                        user=user, path=path, defaults={'records': done},
+                    )
+                imported += len(recipes)
+
+                if options['verbosity'] > 1:
+                    self.stdout.write(self.throughput(imported, start))
+
+        checkpoints.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.throughput(imported, start)}, skipped {skipped}.'
+        ))
+
+    def throughput(self, imported, start):
+        """Return the progress message for the recipes imported so far."""
+        elapsed = time.monotonic() - start
+        rate = imported / elapsed if elapsed else 0
+
+        return (
+            f'Imported {imported} recipes in {elapsed:.1f}s '
+            f'({rate:.0f} recipes/s)'
+        )
+
+    def build_recipe(self, user, record):
+        """Return an unsaved recipe and its tag and ingredient names."""
+        recipe = Recipe(user=user, **{
+            name: record[name] for name in RECIPE_FIELDS
+            if record.get(name) is not None
+        })
+        recipe.clean_fields(exclude=[
+            field.name for field in Recipe._meta.fields
+            if field.name not in RECIPE_FIELDS
+        ])
+
+        names = {}
+        for name in ATTR_MODELS:
+            items = (attr_name(item) for item in record.get(name) or [])
+            names[name] = list(dict.fromkeys(item for item in items if item))
+
+        return recipe, names
+
+    def get_attr_ids(self, user, recipes):
+        """Return the IDs of the batch's tags and ingredients by name."""
+        for name, model in ATTR_MODELS.items():
+            ids = self.attr_ids[name]
+            missing = {
+                item for _, names in recipes for item in names[name]
+                if item not in ids
+            }
+            if missing:
+                objs = get_or_create_attrs(model, user, sorted(missing))
+                ids.update((item, obj.id) for item, obj in objs.items())
+
+        return self.attr_ids
+
+    def link_rows(self, recipes, attr_ids):
+        """Return the through model, attribute field and rows of each link."""
+        links = {}
+
+        for name in ATTR_MODELS:
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            attr_field = through._meta.get_field(
+                field.m2m_reverse_field_name()
+            )
+            rows = [
+                (recipe.id, attr_ids[name][item])
+                for recipe, names in recipes for item in names[name]
+            ]
+            links[name] = (through, attr_field, rows)
+
+        return links.values()
+
+    def insert_batch(self, user, recipes):
+        """Write a batch of recipes and links with INSERT statements."""
+        attr_ids = self.get_attr_ids(user, recipes)
+        Recipe.objects.bulk_create([recipe for recipe, _ in recipes])
+
+        for through, attr_field, rows in self.link_rows(recipes, attr_ids):
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{attr_field.attname: attr_id})
+                for recipe_id, attr_id in rows
+            ])
+
+        self.send_changed(user, recipes)
+
+    def copy_batch(self, user, recipes):
+        """Write a batch of recipes and links with COPY."""
+        attr_ids = self.get_attr_ids(user, recipes)
+        fields = [
+            field for field in Recipe._meta.concrete_fields
+            if field.name != 'search_vector'
+        ]
+
+        with connection.cursor() as cursor:
+            # COPY returns no IDs, so take them from the sequence first.
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) "
+                'FROM generate_series(1, %s)',
+                [Recipe._meta.db_table, len(recipes)],
+            )
+            for (recipe, _), (recipe_id,) in zip(recipes, cursor.fetchall()):
+                recipe.id = recipe_id
+
+            # The connection itself, looking it up per value is costly.
+            db = cursor.db
+            self.copy(cursor, Recipe._meta.db_table, fields, (
+                [
+                    field.get_db_prep_save(getattr(recipe, field.attname), db)
+                    for field in fields
+                ]
+                for recipe, _ in recipes
+            ))
+
+            for through, attr_field, rows in self.link_rows(
+                recipes, attr_ids
+            ):
+                self.copy(cursor, through._meta.db_table, [
+                    through._meta.get_field('recipe'), attr_field,
+                ], rows)
+
+        self.send_changed(user, recipes)
+
+    def copy(self, cursor, table, fields, rows):
+        """Copy rows into the columns of the given fields as CSV."""
+        buffer = io.StringIO()
+        # Quoted empty strings stay strings, unquoted empty values are NULL.
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        buffer.seek(0)
+
+        quote_name = cursor.db.ops.quote_name
+        columns = ', '.join(quote_name(field.column) for field in fields)
+        cursor.copy_expert(
+            f'COPY {quote_name(table)} ({columns}) '
+            'FROM STDIN WITH (FORMAT csv)',
+            buffer,
+        )
+
+    def send_changed(self, user, recipes):
+        """Bump the versions the bulk writes skipped."""
+        recipes_bulk_changed.send(
+            sender=Recipe,
+            user_id=user.id,
+            created=[recipe.id for recipe, _ in recipes],
+            updated=[],
+            deleted=[],
+        )
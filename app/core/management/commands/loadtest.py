@@ -0,0 +1,123 @@
+"""
+Django command to load test a running API server.
+"""
+import http.client
+import itertools
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+)
+
+
+def percentile(ordered, fraction):
+    """Return the value below which the fraction of sorted values falls."""
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    """Django command to measure throughput and latency under load."""
+
+    help = (
+        'Send GET requests to a URL from many concurrent keep-alive '
+        'connections and report throughput and latency, to compare the '
+        'WSGI and ASGI servers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--token', help='API token to authenticate with.')
+        parser.add_argument('--concurrency', type=int, default=64)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        """Entry point for the command."""
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only http:// URLs are supported.')
+
+        path = url.path or '/'
+        if url.query:
+            path = f'{path}?{url.query}'
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        # Each connection takes request numbers until all are sent.
+        numbers = itertools.count()
+        lock = threading.Lock()
+        latencies = []
+        statuses = Counter()
+
+        def send(connection):
+            """Return the response status, or None if the server hung up."""
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (ConnectionResetError, http.client.RemoteDisconnected):
+                return None
+            if response.will_close:
+                connection.close()
+
+            return response.status
+
+        def run():
+            connection = http.client.HTTPConnection(
+                url.hostname, url.port, timeout=options['timeout']
+            )
+            while next(numbers) < options['requests']:
+                start = time.perf_counter()
+                try:
+                    status = send(connection)
+                    if status is None:
+                        # Servers may close idle keep-alive connections, so
+                        # retry once on a new one, as HTTP clients do.
+                        connection.close()
+                        status = send(connection)
+                    if status is None:
+                        status = 'disconnected'
+                except (OSError, http.client.HTTPException) as exc:
+                    status = type(exc).__name__
+                    connection.close()
+                elapsed = time.perf_counter() - start
+
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[status] += 1
+            connection.close()
+
+        threads = [
+            threading.Thread(target=run)
+            for _ in range(options['concurrency'])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - start
+
+        latencies.sort()
+        self.stdout.write(
+            f'{len(latencies)} requests from {options["concurrency"]} '
+            f'connections in {duration:.2f}s '
+            f'({len(latencies) / duration:.0f} requests/s)'
+        )
+        if latencies:
+            self.stdout.write('Latency ms: ' + ', '.join(
+                f'{name} {percentile(latencies, fraction) * 1000:.1f}'
+                for name, fraction in (
+                    ('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1)
+                )
+            ))
+        self.stdout.write('Responses: ' + ', '.join(
+            f'{status}: {count}' for status, count in sorted(
+                statuses.items(), key=lambda item: str(item[0])
+            )
+        ))
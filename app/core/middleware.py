@@ -0,0 +1,42 @@
+"""
+Middleware for the core app.
+"""
+from django.conf import settings
+
+from core.db.routers import (
+    replica_reads,
+    stick_to_primary,
+)
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Send the reads of safe requests to replicas, if there are any.
+
+    After an unsafe request, the user's reads stay on the primary for a few
+    seconds so they see their own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            # The user is only known once the view authenticated it.
+            user = getattr(request, 'user', None)
+            if (
+                settings.DATABASE_REPLICAS
+                and user is not None
+                and user.is_authenticated
+            ):
+                stick_to_primary(user)
+            return response
+
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        with replica_reads(request):
+            return self.get_response(request)
@@ -0,0 +1,50 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:42
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_names(apps, schema_editor):
+    """Merge tags and ingredients sharing a name into the oldest one."""
+    Recipe = apps.get_model('core', 'Recipe')
+
+    for model_name, field_name in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(field_name).remote_field.through
+        column = f'{model_name.lower()}_id'
+
+        duplicates = model.objects.values('user', 'name').annotate(
+            keep=Min('id'),
+            total=Count('id'),
+        ).filter(total__gt=1)
+
+        for duplicate in duplicates:
+            keep = duplicate['keep']
+            merged = list(model.objects.filter(
+                user=duplicate['user'],
+                name=duplicate['name'],
+            ).exclude(id=keep).values_list('id', flat=True))
+
+            links = through.objects.filter(**{f'{column}__in': merged})
+            recipe_ids = set(links.values_list('recipe_id', flat=True))
+            recipe_ids -= set(through.objects.filter(
+                **{column: keep}
+            ).values_list('recipe_id', flat=True))
+
+            links.delete()
+            through.objects.bulk_create([
+                through(recipe_id=recipe_id, **{column: keep})
+                for recipe_id in recipe_ids
+            ])
+            model.objects.filter(id__in=merged).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:53
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+# The through tables only have single column indexes from their foreign
+# keys, so lookups by tag or ingredient have to visit the table for the
+# recipe id.  These cover those reverse probes with index only scans.
+THROUGH_INDEXES = [
+    ('core_recipe_tags', 'recipe_tags_tag_recipe_idx', 'tag_id'),
+    (
+        'core_recipe_ingredients',
+        'recipe_ingredients_ingredient_recipe_idx',
+        'ingredient_id',
+    ),
+]
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so large tables stay writable.
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_recipe_search_vector'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-name', '-id'], name='ingredient_user_name_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(fields=['user', '-name', '-id'], name='tag_user_name_id_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            sql=(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} ({column}, recipe_id)'
+            ),
+            reverse_sql=f'DROP INDEX CONCURRENTLY IF EXISTS {name}',
+        )
+        for table, name, column in THROUGH_INDEXES
+    ]
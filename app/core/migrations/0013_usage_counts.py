@@ -0,0 +1,88 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+# Link table, attribute table and attribute column of each counted model.
+LINK_TABLES = [
+    ('core_recipe_tags', 'core_tag', 'tag_id'),
+    ('core_recipe_ingredients', 'core_ingredient', 'ingredient_id'),
+]
+
+# Statement level triggers with transition tables update each count once
+# per statement, however many links a bulk insert or delete touches.
+CREATE_TRIGGERS = """
+CREATE FUNCTION {links}_usage_count_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE {attrs} SET usage_count = usage_count + delta.count
+        FROM (
+            SELECT {column}, count(*) AS count FROM new_links GROUP BY {column}
+        ) AS delta
+        WHERE {attrs}.id = delta.{column};
+    ELSE
+        UPDATE {attrs} SET usage_count = usage_count - delta.count
+        FROM (
+            SELECT {column}, count(*) AS count FROM old_links GROUP BY {column}
+        ) AS delta
+        WHERE {attrs}.id = delta.{column};
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {links}_usage_count_insert_trigger
+AFTER INSERT ON {links} REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE FUNCTION {links}_usage_count_update();
+
+CREATE TRIGGER {links}_usage_count_delete_trigger
+AFTER DELETE ON {links} REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE FUNCTION {links}_usage_count_update();
+
+UPDATE {attrs} SET usage_count = delta.count
+FROM (SELECT {column}, count(*) AS count FROM {links} GROUP BY {column}) AS delta
+WHERE {attrs}.id = delta.{column};
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER {links}_usage_count_insert_trigger ON {links};
+DROP TRIGGER {links}_usage_count_delete_trigger ON {links};
+DROP FUNCTION {links}_usage_count_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ] + [
+        # Creating the triggers locks the link table until the backfill
+        # commits, so no link is missed or counted twice.
+        migrations.RunSQL(
+            CREATE_TRIGGERS.format(links=links, attrs=attrs, column=column),
+            DROP_TRIGGERS.format(links=links),
+        )
+        for links, attrs, column in LINK_TABLES
+    ] + [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', '-usage_count', '-name', '-id'], name='ingredient_user_usage_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-usage_count', '-name', '-id'], name='tag_user_usage_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:21
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently so large tables stay writable.
+    atomic = False
+
+    dependencies = [
+        ('core', '0013_usage_counts'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='ingredient',
+            index=models.Index(django.db.models.expressions.F('user'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='ingredient_name_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='tag',
+            index=models.Index(django.db.models.expressions.F('user'), django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Lower('name'), name='text_pattern_ops'), name='tag_name_prefix_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.TextField()),
+                ('records', models.PositiveBigIntegerField(default=0)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='recipeimportcheckpoint',
+            constraint=models.UniqueConstraint(fields=('user', 'path'), name='unique_import_checkpoint_per_user'),
+        ),
+    ]
@@ -5,7 +5,18 @@ import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import (
+    GinIndex,
+    OpClass,
+)
+from django.contrib.postgres.search import SearchVectorField
+from django.db import (
+    connection,
+    models,
+)
+from django.db.models import F
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -55,7 +66,36 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
 
 
-class Recipe(models.Model):
+class MaintainedFieldsModel(models.Model):
+    """Model whose full saves leave out the fields maintained elsewhere.
+
+    Those fields are only written by the updates maintaining them, or by
+    saves naming them in ``update_fields``, as a full save of an instance
+    loaded earlier would write back their stale values.
+    """
+    maintained_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not kwargs.get('force_insert')
+            and kwargs.get('update_fields') is None
+        ):
+            # Deferred fields are left out too, as Django's own saves do.
+            skipped = {*self.maintained_fields, *self.get_deferred_fields()}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in skipped
+                and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Recipe(MaintainedFieldsModel):
     """Recipe object."""
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -69,12 +109,159 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image_derivatives = models.JSONField(default=dict, blank=True)
+    # Bumped by core.signals whenever the recipe or its links change.
+    version = models.PositiveIntegerField(default=1, editable=False)
+    modified = models.DateTimeField(default=timezone.now, editable=False)
+    # Maintained by a database trigger from the title and description.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Concurrent writers bump the version with F() updates, so saving an
+    # instance loaded before one of them must not undo the bump.  The image
+    # derivatives are written by the worker generating them, and by the
+    # image uploads resetting them.
+    maintained_fields = ('version', 'modified', 'image_derivatives')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='recipe_search_idx'),
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Tag(models.Model):
+class CollectionVersionManager(models.Manager):
+    """Manager for per-user collection versions."""
+
+    def bump(self, user_id, *collections):
+        """Increment the versions of a user's collections."""
+        table = self.model._meta.db_table
+        collections = sorted(set(collections))
+        rows = ', '.join(['(%s, %s, 1, %s)'] * len(collections))
+        params = []
+        now = timezone.now()
+        for collection in collections:
+            params.extend([user_id, collection, now])
+
+        # Upsert so the first change creates the row without a race.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} '
+                '(user_id, collection, version, modified) '
+                f'VALUES {rows} ON CONFLICT (user_id, collection) DO UPDATE '
+                f'SET version = {table}.version + 1, '
+                'modified = EXCLUDED.modified',
+                params,
+            )
+
+    def get_version(self, user, collection):
+        """Return the version and modification time of a collection."""
+        row = self.filter(user=user, collection=collection).values_list(
+            'version', 'modified'
+        ).first()
+
+        return row or (0, None)
+
+
+class CollectionVersion(models.Model):
+    """Version of a user's recipes, tags or ingredients."""
+    RECIPES = 'recipe'
+    TAGS = 'tag'
+    INGREDIENTS = 'ingredient'
+    COLLECTION_CHOICES = [
+        (RECIPES, 'Recipes'),
+        (TAGS, 'Tags'),
+        (INGREDIENTS, 'Ingredients'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    collection = models.CharField(max_length=20, choices=COLLECTION_CHOICES)
+    version = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(default=timezone.now)
+
+    objects = CollectionVersionManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'collection'],
+                name='unique_collection_version_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.collection} v{self.version}'
+
+
+class RecipeImageUpload(models.Model):
+    """Chunked upload of a recipe image in progress."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_uploads',
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def partial_directory():
+        """Return the directory received bytes are written to."""
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial')
+
+    @property
+    def partial_path(self):
+        """Return the path the received bytes are written to."""
+        return os.path.join(self.partial_directory(), f'{self.id}.part')
+
+    def __str__(self):
+        return self.filename
+
+
+class RecipeImportCheckpoint(models.Model):
+    """Records of a file imported so far, committed with each batch."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    path = models.TextField()
+    records = models.PositiveBigIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'path'],
+                name='unique_import_checkpoint_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.path}: {self.records}'
+
+
+class UsageCountedModel(MaintainedFieldsModel):
+    """Recipe attribute counting the recipes linked to it."""
+    # Maintained by database triggers on the recipe link tables, so bulk
+    # writes and cascading deletes are counted too.
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Writing back a stale count would undo links made since the object was
+    # loaded.
+    maintained_fields = ('usage_count',)
+
+    class Meta:
+        abstract = True
+
+
+class Tag(UsageCountedModel):
     """Tag to be used for a recipe."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
@@ -82,11 +269,35 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='tag_user_name_id_idx',
+            ),
+            models.Index(
+                fields=['user', '-usage_count', '-name', '-id'],
+                name='tag_user_usage_idx',
+            ),
+            # Prefix searches of lowercase names, for autocompletion.
+            models.Index(
+                F('user'),
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='tag_name_prefix_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(UsageCountedModel):
     """Ingredient to be used in a recipe."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
@@ -94,5 +305,29 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_ingredient_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-name', '-id'],
+                name='ingredient_user_name_id_idx',
+            ),
+            models.Index(
+                fields=['user', '-usage_count', '-name', '-id'],
+                name='ingredient_user_usage_idx',
+            ),
+            # Prefix searches of lowercase names, for autocompletion.
+            models.Index(
+                F('user'),
+                OpClass(Lower('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
@@ -0,0 +1,35 @@
+"""
+Fast parsers for API requests.
+"""
+import msgpack
+import orjson
+
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from core import renderers
+
+
+class ORJSONParser(parsers.JSONParser):
+    """Parse JSON with orjson, a drop-in for DRF's JSONParser."""
+    renderer_class = renderers.ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse a JSON request body."""
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parse application/msgpack request bodies."""
+    media_type = 'application/msgpack'
+    renderer_class = renderers.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse a MessagePack request body."""
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
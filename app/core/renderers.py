@@ -0,0 +1,56 @@
+"""
+Fast renderers for API responses.
+"""
+import msgpack
+import orjson
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    """Convert types msgpack and orjson don't know, as DRF's encoder does."""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """Render JSON with orjson, a drop-in for DRF's JSONRenderer."""
+    options = orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into JSON bytes."""
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # orjson only indents by two spaces.
+            options |= orjson.OPT_INDENT_2
+
+        # orjson escapes nothing beyond what JSON requires, so keep DRF's
+        # escaping of the line separators that JavaScript rejects.
+        ret = orjson.dumps(data, default=encode_default, option=options)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+                b'\xe2\x80\xa9', b'\\u2029'
+            )
+
+        return ret
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render MessagePack for clients that ask for application/msgpack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render data into MessagePack bytes."""
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
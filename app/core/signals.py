@@ -0,0 +1,126 @@
+"""
+Signal handlers keeping recipe and collection versions current.
+"""
+from django.db.models import F
+from django.db.models.signals import (
+    m2m_changed,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import (
+    Signal,
+    receiver,
+)
+from django.utils import timezone
+
+from core.models import (
+    CollectionVersion,
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+# Recipe fields linking to each kind of recipe attribute.
+RECIPE_FIELDS = {
+    Tag: 'tags',
+    Ingredient: 'ingredients',
+}
+
+# Sent by bulk writes, which skip the model signals, with the user_id and
+# the created, updated and deleted recipe IDs.
+recipes_bulk_changed = Signal()
+
+
+def bump_recipes(recipes):
+    """Increment the versions of the given recipes."""
+    recipes.update(version=F('version') + 1, modified=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    """Bump the versions a saved recipe appears in."""
+    if not created:
+        bump_recipes(Recipe.objects.filter(pk=instance.pk))
+    CollectionVersion.objects.bump(instance.user_id, CollectionVersion.RECIPES)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Bump the versions of collections a deleted recipe appears in."""
+    # Deleting the recipe drops its links, which can change which tags and
+    # ingredients are assigned.  Deletes bump before rows are removed, so a
+    # cascade from a deleted user removes the bumped versions too.
+    CollectionVersion.objects.bump(
+        instance.user_id,
+        CollectionVersion.RECIPES,
+        CollectionVersion.TAGS,
+        CollectionVersion.INGREDIENTS,
+    )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_saved(sender, instance, created, **kwargs):
+    """Bump the versions a saved tag or ingredient appears in."""
+    collections = [sender._meta.model_name]
+    if not created:
+        # Recipes show the names of their tags and ingredients.
+        bump_recipes(Recipe.objects.filter(**{
+            RECIPE_FIELDS[sender]: instance,
+        }))
+        collections.append(CollectionVersion.RECIPES)
+    CollectionVersion.objects.bump(instance.user_id, *collections)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """Bump the versions a deleted tag or ingredient appears in."""
+    # Runs while the links to the recipes still exist.
+    bump_recipes(Recipe.objects.filter(**{
+        RECIPE_FIELDS[sender]: instance,
+    }))
+    CollectionVersion.objects.bump(
+        instance.user_id, sender._meta.model_name, CollectionVersion.RECIPES
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump the versions of recipes whose links changed."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if action != 'pre_clear' and not pk_set:
+        return
+
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+        collection = kwargs['model']._meta.model_name
+    elif action == 'pre_clear':
+        recipes = Recipe.objects.filter(**{
+            RECIPE_FIELDS[type(instance)]: instance,
+        })
+        collection = instance._meta.model_name
+    else:
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+        collection = instance._meta.model_name
+
+    bump_recipes(recipes)
+    # Links decide which tags and ingredients are assigned to recipes.
+    CollectionVersion.objects.bump(
+        instance.user_id, CollectionVersion.RECIPES, collection
+    )
+
+
+@receiver(recipes_bulk_changed, sender=Recipe)
+def recipes_bulk_saved(sender, user_id, updated, **kwargs):
+    """Bump the versions of recipes and collections changed in bulk."""
+    # Deleted recipes are gone, so only the collections are bumped for them.
+    bump_recipes(Recipe.objects.filter(pk__in=updated))
+    CollectionVersion.objects.bump(
+        user_id,
+        CollectionVersion.RECIPES,
+        CollectionVersion.TAGS,
+        CollectionVersion.INGREDIENTS,
+    )
@@ -1,13 +1,39 @@
 """
 Test custom Django management commands.
 """
+import json
+import os
+import tempfile
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+)
+
+from core.management.commands.import_recipes import Command
+from core.models import (
+    CollectionVersion,
+    Ingredient,
+    Recipe,
+    RecipeImportCheckpoint,
+    Tag,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +58,286 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkListQueriesTests(TransactionTestCase):
+    """Test the list query benchmark command."""
+
+    def test_benchmark_seeds_and_explains(self):
+        """Test benchmark data is seeded and each list query explained."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_list_queries', recipes=100, users=5,
+            without_indexes=True, stdout=out,
+        )
+
+        self.assertEqual(Recipe.objects.count(), 100)
+        self.assertEqual(Recipe.tags.through.objects.count(), 100)
+        self.assertFalse(Recipe.tags.through.objects.exclude(
+            recipe__user=models.F('tag__user')
+        ).exists())
+        self.assertIn('recipe-list', out.getvalue())
+        self.assertIn('usage_count > 0', out.getvalue())
+        self.assertIn('tag-list?ordering=usage', out.getvalue())
+        self.assertIn('Without list indexes', out.getvalue())
+
+    def test_benchmark_clean(self):
+        """Test benchmark data can be deleted."""
+        call_command(
+            'benchmark_list_queries', recipes=100, users=5, stdout=StringIO()
+        )
+
+        call_command('benchmark_list_queries', clean=True, stdout=StringIO())
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+
+class BenchmarkRenderersTests(SimpleTestCase):
+    """Test the renderer benchmark command."""
+
+    def test_benchmark_reports_each_format(self):
+        """Test a row is printed for each wire format."""
+        out = StringIO()
+
+        call_command('benchmark_renderers', iterations=1, stdout=out)
+
+        for name in ('json (DRF)', 'json (orjson)', 'msgpack'):
+            self.assertIn(name, out.getvalue())
+
+
+class _OKHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 200 if self.headers['Authorization'] == 'Token abc' else 401
+        self.send_response(status)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestTests(SimpleTestCase):
+    """Test the load test command."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _OKHandler)
+        threading.Thread(target=self.server.serve_forever).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def test_loadtest_reports_throughput(self):
+        """Test every request is sent and the results summarized."""
+        out = StringIO()
+
+        call_command(
+            'loadtest', self.url, token='abc', concurrency=4, requests=40,
+            stdout=out,
+        )
+
+        self.assertIn('40 requests from 4 connections', out.getvalue())
+        self.assertIn('p99', out.getvalue())
+        self.assertIn('200: 40', out.getvalue())
+
+    def test_loadtest_http_only(self):
+        """Test only plain HTTP URLs are accepted."""
+        with self.assertRaises(CommandError):
+            call_command('loadtest', 'ftp://example.com/', stdout=StringIO())
+
+
+class ImportRecipesTests(TestCase):
+    """Test the recipe import command."""
+
+    records = [
+        {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '7.50',
+            'tags': [{'name': 'Vegan'}, {'name': 'Spicy'}],
+            'ingredients': [{'name': 'Rice'}],
+        },
+        {
+            'title': 'Chili',
+            'time_minutes': 45,
+            'price': '6.00',
+            'description': 'Hot',
+            'tags': ['Spicy'],
+        },
+        {
+            'title': 'Salad',
+            'time_minutes': 5,
+            'price': '3.25',
+            'link': 'https://example.com/salad',
+            'ingredients': [{'name': 'Rice'}, {'name': 'Lettuce'}],
+        },
+    ]
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write_file(self, name, content):
+        """Write a file to import and return its path."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+
+        return path
+
+    def write_ndjson(self, records):
+        """Write records as JSON lines and return the path."""
+        return self.write_file('recipes.ndjson', ''.join(
+            json.dumps(record) + '\n' for record in records
+        ))
+
+    def import_recipes(self, path, **options):
+        """Run the import command for the user, returning its output."""
+        out = StringIO()
+        err = StringIO()
+        call_command(
+            'import_recipes', path, user=self.user.email,
+            stdout=out, stderr=err, **options,
+        )
+
+        return out.getvalue(), err.getvalue()
+
+    def assertImported(self):
+        """Assert the sample records were imported with their links."""
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [recipe.title for recipe in recipes], ['Curry', 'Chili', 'Salad']
+        )
+        curry, chili, salad = recipes
+        self.assertEqual(curry.price, Decimal('7.50'))
+        self.assertEqual(chili.description, 'Hot')
+        self.assertEqual(salad.link, 'https://example.com/salad')
+        self.assertEqual(
+            set(curry.tags.values_list('name', flat=True)), {'Vegan', 'Spicy'}
+        )
+        self.assertEqual(list(chili.tags.values_list('name', flat=True)),
+                         ['Spicy'])
+        self.assertEqual(
+            set(salad.ingredients.values_list('name', flat=True)),
+            {'Rice', 'Lettuce'},
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_import_ndjson(self):
+        """Test importing recipes in batches from JSON lines."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        path = self.write_ndjson(self.records)
+
+        out, err = self.import_recipes(path, batch_size=2)
+
+        self.assertImported()
+        self.assertIn('Imported 3 recipes', out)
+        self.assertIn('recipes/s', out)
+        self.assertFalse(RecipeImportCheckpoint.objects.exists())
+        self.assertGreater(CollectionVersion.objects.get_version(
+            self.user, CollectionVersion.RECIPES
+        )[0], 0)
+
+    def test_import_csv_with_copy(self):
+        """Test importing recipes from CSV with COPY."""
+        path = self.write_file('recipes.csv', (
+            'id,title,time_minutes,price,link,description,image,tags,'
+            'ingredients\n'
+            '9,Curry,30,7.50,,,,Vegan; Spicy,Rice\n'
+            '8,Chili,45,6.00,,Hot,,Spicy,\n'
+            '7,Salad,5,3.25,https://example.com/salad,,,,Rice; Lettuce\n'
+        ))
+
+        self.import_recipes(path, copy=True, batch_size=2)
+
+        self.assertImported()
+        self.assertTrue(Recipe.objects.filter(title='Curry').filter(
+            search_vector='curry'
+        ).exists())
+
+    def test_invalid_records_skipped(self):
+        """Test invalid records are reported and the others imported."""
+        path = self.write_ndjson([
+            self.records[0],
+            {'title': 'No time', 'price': '1.00'},
+            {'title': 'Bad price', 'time_minutes': 5, 'price': 'free'},
+        ] + self.records[1:])
+
+        out, err = self.import_recipes(path)
+
+        self.assertImported()
+        self.assertIn('Skipped record 2', err)
+        self.assertIn('Skipped record 3', err)
+        self.assertIn('skipped 2', out)
+
+    def test_malformed_records_skipped(self):
+        """Test lines that are not JSON objects are reported and skipped."""
+        path = self.write_file('recipes.ndjson', '\n'.join([
+            json.dumps(self.records[0]),
+            '{"title": ',
+            '["Not", "a", "record"]',
+            json.dumps({**self.records[1], 'tags': [{'name': 1}]}),
+        ] + [json.dumps(record) for record in self.records[1:]]) + '\n')
+
+        out, err = self.import_recipes(path)
+
+        self.assertImported()
+        for number in (2, 3, 4):
+            self.assertIn(f'Skipped record {number}', err)
+        self.assertIn('skipped 3', out)
+
+    def test_resume_from_checkpoint(self):
+        """Test an interrupted import resumes after the last batch."""
+        path = self.write_ndjson([
+            {'title': 'Done', 'time_minutes': 1, 'price': '1.00'},
+        ] + self.records)
+        RecipeImportCheckpoint.objects.create(
+            user=self.user, path=path, records=1
+        )
+
+        out, err = self.import_recipes(path)
+
+        self.assertIn('Resuming after 1 records', out)
+        self.assertImported()
+        self.assertFalse(RecipeImportCheckpoint.objects.exists())
+
+    def test_checkpoint_committed_with_batch(self):
+        """Test a crash after a batch commits does not import it twice."""
+        path = self.write_ndjson(self.records)
+        insert_batch = Command.insert_batch
+        calls = []
+
+        def crash_on_second_batch(command, user, recipes):
+            calls.append(recipes)
+            if len(calls) == 2:
+                raise RuntimeError('Crashed')
+            insert_batch(command, user, recipes)
+
+        with patch.object(Command, 'insert_batch', crash_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self.import_recipes(path, batch_size=2)
+
+        self.assertEqual(RecipeImportCheckpoint.objects.get().records, 2)
+        self.import_recipes(path, batch_size=2)
+
+        self.assertImported()
+
+    def test_restart_ignores_checkpoint(self):
+        """Test a restarted import reads the file from the start."""
+        path = self.write_ndjson(self.records)
+        RecipeImportCheckpoint.objects.create(
+            user=self.user, path=path, records=2
+        )
+
+        self.import_recipes(path, restart=True)
+
+        self.assertImported()
@@ -0,0 +1,176 @@
+"""
+Tests for the database backend and connection pool.
+"""
+import threading
+from unittest.mock import Mock
+
+from psycopg2 import extensions
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import (
+    ConnectionPool,
+    PoolTimeout,
+)
+
+
+DB_STATS_URL = reverse('db-stats')
+
+
+def fake_connection():
+    """Return a stand-in for an idle psycopg2 connection."""
+    conn = Mock(closed=0)
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool."""
+
+    def test_connections_reused(self):
+        """Test released connections are handed out again."""
+        connect = Mock(side_effect=fake_connection)
+        pool = ConnectionPool(connect, max_size=2, timeout=1)
+
+        conn = pool.acquire()
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(connect.call_count, 1)
+        stats = pool.stats()
+        self.assertEqual(stats['acquired'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['waits'], 0)
+
+    def test_acquire_times_out(self):
+        """Test waiting for a full pool raises after the timeout."""
+        pool = ConnectionPool(fake_connection, max_size=1, timeout=0.01)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_acquire_waits_for_release(self):
+        """Test callers wait for a connection to be released."""
+        pool = ConnectionPool(fake_connection, max_size=1, timeout=5)
+        conn = pool.acquire()
+        timer = threading.Timer(0.05, pool.release, [conn])
+        timer.start()
+
+        self.assertIs(pool.acquire(), conn)
+
+        timer.join()
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait_time'], 0)
+
+    def test_release_rolls_back(self):
+        """Test connections released in a transaction are rolled back."""
+        pool = ConnectionPool(fake_connection, max_size=1, timeout=1)
+        conn = pool.acquire()
+        conn.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+        pool.release(conn)
+
+        conn.rollback.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_closed_connections_discarded(self):
+        """Test closed connections are not returned to the pool."""
+        pool = ConnectionPool(fake_connection, max_size=1, timeout=1)
+        conn = pool.acquire()
+        conn.closed = 1
+
+        pool.release(conn)
+
+        self.assertEqual(pool.stats()['size'], 0)
+        self.assertIsNot(pool.acquire(), conn)
+
+
+class DatabaseWrapperTests(SimpleTestCase):
+    """Test the PostgreSQL backend with health checks and pooling."""
+
+    def make_wrapper(self, **settings):
+        """Return a connection to the test database with the settings."""
+        settings_dict = {**connection.settings_dict, **settings}
+        wrapper = DatabaseWrapper(settings_dict)
+        self.addCleanup(wrapper.close)
+
+        return wrapper
+
+    def test_health_check_replaces_broken_connection(self):
+        """Test a persistent connection that went away is replaced."""
+        wrapper = self.make_wrapper(
+            CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True
+        )
+        wrapper.ensure_connection()
+        broken = wrapper.connection
+        broken.close()
+        # As at the start of a request.
+        wrapper.close_if_unusable_or_obsolete()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+        self.assertIsNot(wrapper.connection, broken)
+
+    def test_pooled_connection_returned_on_close(self):
+        """Test closing a pooled connection hands it to the next user."""
+        wrapper = self.make_wrapper(POOL_SIZE=1)
+        self.addCleanup(wrapper.pool.close_idle)
+        wrapper.ensure_connection()
+        conn = wrapper.connection
+
+        wrapper.close()
+
+        self.assertFalse(conn.closed)
+        self.assertEqual(wrapper.pool_stats()['idle'], 1)
+        other = self.make_wrapper(POOL_SIZE=1)
+        other.ensure_connection()
+        self.assertIs(other.connection, conn)
+
+
+class DatabaseStatsApiTests(TestCase):
+    """Test the database statistics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_stats_staff_only(self):
+        """Test the statistics are not shown to other users."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats(self):
+        """Test the connection settings are reported per alias."""
+        user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('default', res.data['databases'])
+        self.assertIn('pool', res.data['databases']['default'])
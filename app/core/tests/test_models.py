@@ -4,6 +4,7 @@ Test for models.
 from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -84,6 +85,16 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=other_user, name='Vegan')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Vegan')
+
     def test_create_ingredient(self):
         """Test creating a new ingredient."""
         user = create_user()
@@ -92,6 +103,124 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_collection_version_bumped(self):
+        """Test changes bump the versions of the user's collections."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        recipe_version, _ = models.CollectionVersion.objects.get_version(
+            user, models.CollectionVersion.RECIPES
+        )
+
+        recipe.tags.add(tag)
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 2)
+        self.assertEqual(
+            models.CollectionVersion.objects.get_version(
+                user, models.CollectionVersion.RECIPES
+            )[0],
+            recipe_version + 1,
+        )
+
+    def test_delete_user_with_recipes(self):
+        """Test deleting a user removes their recipes and versions."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        recipe.tags.add(models.Tag.objects.create(user=user, name='Vegan'))
+
+        user.delete()
+
+        self.assertFalse(models.CollectionVersion.objects.exists())
+
+    def test_usage_counts_maintained(self):
+        """Test tag and ingredient usage counts follow the links."""
+        user = create_user()
+        recipes = [
+            models.Recipe.objects.create(
+                user=user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('5.50'),
+            )
+            for i in range(3)
+        ]
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        ingredient = models.Ingredient.objects.create(user=user, name='Salt')
+
+        def counts():
+            tag.refresh_from_db()
+            ingredient.refresh_from_db()
+            return tag.usage_count, ingredient.usage_count
+
+        for recipe in recipes:
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        self.assertEqual(counts(), (3, 3))
+
+        recipes[0].tags.remove(tag)
+        ingredient.recipe_set.remove(recipes[0])
+        self.assertEqual(counts(), (2, 2))
+
+        recipes[1].delete()
+        self.assertEqual(counts(), (1, 1))
+
+        tag.recipe_set.clear()
+        models.Recipe.ingredients.through.objects.bulk_create([
+            models.Recipe.ingredients.through(
+                recipe=recipes[0], ingredient=ingredient
+            ),
+        ])
+        self.assertEqual(counts(), (0, 2))
+
+    def test_save_keeps_usage_count(self):
+        """Test saving a loaded tag does not overwrite its usage count."""
+        user = create_user()
+        tag = models.Tag.objects.create(user=user, name='Vegan')
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        recipe.tags.add(tag)
+
+        tag.name = 'Vegetarian'
+        tag.save()
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegetarian')
+        self.assertEqual(tag.usage_count, 1)
+
+    def test_stale_recipe_save_bumps_version(self):
+        """Test saving a recipe loaded before a bump still bumps it."""
+        user = create_user()
+        recipe = models.Recipe.objects.create(
+            user=user,
+            title='Sample recipe name',
+            time_minutes=5,
+            price=Decimal('5.50'),
+        )
+        stale = models.Recipe.objects.get(id=recipe.id)
+        recipe.tags.add(models.Tag.objects.create(user=user, name='Vegan'))
+
+        stale.title = 'Patched'
+        stale.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Patched')
+        self.assertEqual(recipe.version, 3)
+
     @patch('core.models.uuid.uuid4')
     def test_recipe_file_name_uuid(self, mock_uuid):
         """Test that image is saved in the correct location."""
@@ -0,0 +1,128 @@
+"""
+Tests for the fast renderers and parsers.
+"""
+import datetime
+import io
+import json
+from decimal import Decimal
+
+import msgpack
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import (
+    ErrorDetail,
+    ParseError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import (
+    parsers,
+    renderers,
+)
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RendererTests(SimpleTestCase):
+    """Test rendering and parsing request and response bodies."""
+
+    data = {
+        'price': Decimal('5.50'),
+        'created': datetime.datetime(2024, 1, 2, 3, 4, 5),
+        'errors': [ErrorDetail('Invalid', code='invalid')],
+        1: 'numeric key',
+    }
+
+    def test_orjson_matches_json(self):
+        """Test orjson renders the same values as DRF's renderer."""
+        rendered = renderers.ORJSONRenderer().render(self.data)
+
+        self.assertEqual(
+            json.loads(rendered),
+            json.loads(JSONRenderer().render(self.data)),
+        )
+
+    def test_orjson_indent(self):
+        """Test an indent in the accepted media type pretty prints."""
+        rendered = renderers.ORJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(rendered, b'{\n  "a": 1\n}')
+
+    def test_orjson_escapes_line_separators(self):
+        """Test the JavaScript line separators are escaped."""
+        rendered = renderers.ORJSONRenderer().render({'a': '\u2028'})
+
+        self.assertEqual(rendered, b'{"a":"\\u2028"}')
+
+    def test_orjson_parse_error(self):
+        """Test invalid JSON raises a parse error."""
+        with self.assertRaises(ParseError):
+            parsers.ORJSONParser().parse(io.BytesIO(b'{"a": '))
+
+    def test_msgpack_round_trip(self):
+        """Test MessagePack bodies parse back to the rendered values."""
+        data = {'price': '5.50', 'tags': [{'name': 'Vegan'}]}
+        rendered = renderers.MessagePackRenderer().render(data)
+
+        parsed = parsers.MessagePackParser().parse(io.BytesIO(rendered))
+
+        self.assertEqual(parsed, data)
+
+    def test_msgpack_parse_error(self):
+        """Test truncated MessagePack raises a parse error."""
+        rendered = renderers.MessagePackRenderer().render({'a': 'text'})
+
+        with self.assertRaises(ParseError):
+            parsers.MessagePackParser().parse(io.BytesIO(rendered[:-2]))
+
+
+class ContentNegotiationTests(TestCase):
+    """Test choosing the wire format by content negotiation."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_json_by_default(self):
+        """Test responses are JSON unless another format is asked for."""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(res.json()['results'], [])
+
+    def test_msgpack_request_and_response(self):
+        """Test a client can send and receive MessagePack."""
+        payload = {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': '5.99',
+            'tags': [{'name': 'Vegan'}],
+        }
+
+        res = self.client.post(
+            RECIPES_URL, payload, format='msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        body = msgpack.unpackb(res.content)
+        self.assertEqual(body['price'], '5.99')
+        self.assertEqual(body['tags'][0]['name'], 'Vegan')
+        self.assertTrue(Recipe.objects.filter(id=body['id']).exists())
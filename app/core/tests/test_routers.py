@@ -0,0 +1,167 @@
+"""
+Tests for routing reads to database replicas.
+"""
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import (
+    OperationalError,
+    router,
+)
+from django.http import HttpResponse
+from django.test import (
+    override_settings,
+    RequestFactory,
+    TestCase,
+)
+
+from core.checks import check_replica_sticky_cache
+from core.db import routers
+from core.db.routers import sticky_cache_shared
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TestCase):
+    """Test reads of safe requests go to a healthy replica."""
+
+    def setUp(self):
+        cache.clear()
+        routers._unhealthy_until.clear()
+        self.replica = Mock()
+        patcher = patch.object(
+            routers, 'connections', {'replica': self.replica}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Stands in for a cache shared by the workers.
+        patcher = patch.object(
+            routers, 'sticky_cache_shared', return_value=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def handle(self, method, view=None):
+        """Return the database of a recipe read made while handling."""
+        aliases = []
+
+        def get_response(request):
+            if view:
+                view()
+            aliases.append(router.db_for_read(Recipe))
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.user = self.user
+        ReplicaRoutingMiddleware(get_response)(request)
+
+        return aliases[0]
+
+    def test_reads_outside_requests_use_default_routing(self):
+        """Test commands and other code outside requests are not routed."""
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(Recipe))
+
+    def test_safe_request_reads_replica(self):
+        """Test reads of GET requests go to the replica."""
+        self.assertEqual(self.handle('get'), 'replica')
+        self.assertEqual(
+            self.handle('get', view=lambda: self.assertEqual(
+                router.db_for_read(get_user_model()), 'default'
+            )),
+            'replica',
+        )
+
+    def test_unsafe_request_reads_primary(self):
+        """Test reads of POST requests stay on the primary."""
+        self.assertEqual(self.handle('post'), 'default')
+
+    def test_reads_after_write_stick_to_primary(self):
+        """Test a user's reads stay on the primary after they wrote."""
+        self.handle('post')
+
+        self.assertEqual(self.handle('get'), 'default')
+
+        cache.clear()
+        self.assertEqual(self.handle('get'), 'replica')
+
+    def test_reads_after_write_in_request(self):
+        """Test a request reads from the primary once it wrote."""
+        self.assertEqual(
+            self.handle('get', view=lambda: router.db_for_write(Recipe)),
+            'default',
+        )
+
+    def test_unhealthy_replica_skipped(self):
+        """Test an unreachable replica falls back to the primary."""
+        self.replica.ensure_connection.side_effect = OperationalError
+
+        self.assertEqual(self.handle('get'), 'default')
+        self.assertEqual(self.handle('get'), 'default')
+
+        # Not retried until REPLICA_RETRY_SECONDS have passed.
+        self.replica.ensure_connection.assert_called_once()
+
+    def test_dead_replica_connection_skipped(self):
+        """Test a replica lost after connecting falls back to the primary."""
+        self.replica.connection = None
+        self.assertEqual(self.handle('get'), 'replica')
+        self.replica.is_usable.assert_not_called()
+
+        self.replica.connection = Mock()
+        self.replica.is_usable.return_value = False
+        self.replica.ensure_connection.side_effect = OperationalError
+
+        self.assertEqual(self.handle('get'), 'default')
+        self.replica.close.assert_called_once()
+        self.assertEqual(self.handle('get'), 'default')
+        self.assertEqual(self.replica.ensure_connection.call_count, 2)
+
+    def test_reconnects_to_restarted_replica(self):
+        """Test a dropped replica connection is replaced when possible."""
+        self.replica.connection = Mock()
+        self.replica.is_usable.return_value = False
+
+        self.assertEqual(self.handle('get'), 'replica')
+        self.replica.close.assert_called_once()
+        self.replica.ensure_connection.assert_called_once()
+
+    def test_process_local_sticky_cache(self):
+        """Test reads stay on the primary unless workers share writers."""
+        routers.sticky_cache_shared.return_value = False
+
+        self.assertEqual(self.handle('get'), 'default')
+        self.assertEqual(
+            [error.id for error in check_replica_sticky_cache(None)],
+            ['core.W001'],
+        )
+
+    @override_settings(REPLICA_STICKY_CACHE_ALIAS='shared', CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/sticky-cache',
+        },
+    })
+    def test_sticky_cache_shared(self):
+        """Test only per-process caches are taken as unshared."""
+        self.assertTrue(sticky_cache_shared())
+        with override_settings(REPLICA_STICKY_CACHE_ALIAS='default'):
+            self.assertFalse(sticky_cache_shared())
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        """Test reads use the primary without replicas."""
+        self.assertEqual(self.handle('get'), 'default')
+        self.replica.ensure_connection.assert_not_called()
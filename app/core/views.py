@@ -0,0 +1,65 @@
+"""
+Views for the core app.
+"""
+from django.db import connections
+
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiTypes,
+)
+from rest_framework import (
+    permissions,
+    views,
+)
+from rest_framework.response import Response
+
+from recipe.cache import response_cache
+
+
+class DatabaseStatsView(views.APIView):
+    """Report how database connections are kept, for staff.
+
+    The pool statistics are those of the process serving the request.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        """Return the connection settings and pool statistics per alias."""
+        databases = {}
+        for connection in connections.all():
+            settings_dict = connection.settings_dict
+            pool_stats = getattr(connection, 'pool_stats', None)
+            databases[connection.alias] = {
+                'conn_max_age': settings_dict['CONN_MAX_AGE'],
+                'conn_health_checks': settings_dict.get(
+                    'CONN_HEALTH_CHECKS', False
+                ),
+                'disable_server_side_cursors': settings_dict[
+                    'DISABLE_SERVER_SIDE_CURSORS'
+                ],
+                'pool': pool_stats() if pool_stats else None,
+            }
+
+        return Response({'databases': databases})
+
+
+class CacheStatsView(views.APIView):
+    """Report how often cached API responses are served, for staff.
+
+    The counts are those of the process serving the request, since it was
+    started.
+    """
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        """Return the response cache settings and hit and miss counts."""
+        return Response({
+            'response_cache': {
+                'alias': response_cache.alias,
+                'timeout': response_cache.timeout,
+                'enabled': response_cache.enabled,
+                **response_cache.stats(),
+            },
+        })
@@ -0,0 +1,129 @@
+"""
+Autocompletion of tag and ingredient names
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.functions import Lower
+
+
+def _rank(item):
+    """Return the sort key of a match, most used first"""
+    return (-item['usage_count'], item['key'], item['id'])
+
+
+class PrefixIndex:
+    """Names of a user's tags or ingredients sorted for prefix lookups"""
+
+    def __init__(self, items):
+        self.items = sorted(items, key=lambda item: item['key'])
+        self.keys = [item['key'] for item in self.items]
+
+    def search(self, text, limit):
+        """Return the best prefix matches, then the best fragment matches"""
+        start = bisect_left(self.keys, text)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(text):
+            end += 1
+
+        matches = heapq.nsmallest(limit, self.items[start:end], key=_rank)
+        if len(matches) < limit:
+            matches += heapq.nsmallest(limit - len(matches), (
+                item for item in self.items
+                if text in item['key'] and not item['key'].startswith(text)
+            ), key=_rank)
+
+        return matches
+
+
+def load_items(queryset, limit=None):
+    """Return the ID, name, lowercase name and usage of each object"""
+    queryset = queryset.annotate(key=Lower('name')).values(
+        'id', 'name', 'key', 'usage_count'
+    )
+    if limit is not None:
+        queryset = queryset[:limit]
+
+    return list(queryset)
+
+
+def query_matches(queryset, text, limit):
+    """Return the best matches from the database, ranked as PrefixIndex"""
+    queryset = queryset.annotate(key=Lower('name')).order_by(
+        '-usage_count', 'key', 'id'
+    )
+    # Served by the (user, lower(name) text_pattern_ops) index.
+    matches = load_items(queryset.filter(key__startswith=text), limit)
+    if len(matches) < limit:
+        matches += load_items(
+            queryset.filter(key__contains=text).exclude(
+                key__startswith=text
+            ),
+            limit - len(matches),
+        )
+
+    return matches
+
+
+class AutocompleteCache:
+    """Per-process LRU of the prefix indexes of recently active users.
+
+    Each index is stored with the version of the collection it was loaded
+    at and rebuilt once that version moves on.
+    """
+
+    def __init__(self, max_users, max_names):
+        self.max_users = max_users
+        self.max_names = max_names
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        """Return whether indexes are cached"""
+        return self.max_users > 0
+
+    def get_index(self, key, version, queryset):
+        """Return the index for the key at the version, or None if too big"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # Loaded outside the lock so other users are not held up.
+        items = load_items(queryset, self.max_names + 1)
+        index = PrefixIndex(items) if len(items) <= self.max_names else None
+
+        with self._lock:
+            self._entries[key] = (version, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        return index
+
+    def clear(self):
+        """Drop every cached index"""
+        with self._lock:
+            self._entries.clear()
+
+
+autocomplete_cache = AutocompleteCache(
+    max_users=settings.AUTOCOMPLETE_CACHE_USERS,
+    max_names=settings.AUTOCOMPLETE_CACHE_MAX_NAMES,
+)
+
+
+def complete(queryset, cache_key, version, text, limit):
+    """Return up to limit matches for text, from the cache if possible"""
+    text = text.lower()
+    if autocomplete_cache.enabled:
+        index = autocomplete_cache.get_index(cache_key, version, queryset)
+        if index is not None:
+            return index.search(text, limit)
+
+    return query_matches(queryset, text, limit)
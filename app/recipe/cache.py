@@ -0,0 +1,72 @@
+"""
+Cache of serialized recipe API responses
+"""
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ResponseCache:
+    """Cache of response data keyed by the versioned ETag of the request.
+
+    The ETag includes the versions of the data a response is built from, so
+    any change to that data moves requests to a new key and the old entries
+    are never read again; they expire after ``timeout`` seconds.
+    """
+    key_prefix = 'api-response:'
+
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        """Return the cache backend"""
+        return caches[self.alias]
+
+    @property
+    def enabled(self):
+        """Return whether responses are cached"""
+        return self.timeout > 0
+
+    def get(self, key):
+        """Return the cached response data, or None"""
+        data = self.cache.get(self.key_prefix + key)
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return data
+
+    def set(self, key, data):
+        """Cache response data"""
+        self.cache.set(self.key_prefix + key, data, timeout=self.timeout)
+
+    def stats(self):
+        """Return the hit and miss counts of this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        """Reset the hit and miss counts"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+response_cache = ResponseCache(
+    alias=settings.RESPONSE_CACHE_ALIAS,
+    timeout=settings.RESPONSE_CACHE_TIMEOUT,
+)
@@ -0,0 +1,130 @@
+"""
+Conditional GET and response caching for the recipe API
+"""
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response,
+    patch_vary_headers,
+)
+from django.utils.http import (
+    http_date,
+    quote_etag,
+)
+
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+from recipe.cache import response_cache
+
+
+class ConditionalGetMixin:
+    """Answer unchanged list and detail requests with 304 Not Modified
+
+    Other requests for the same version are answered from the response
+    cache without running the query or the serializer.
+    """
+    version_collection = None
+    response_cache = response_cache
+    # Query params holding comma separated IDs or 0/1 flags, which are
+    # normalized so equivalent requests share an ETag and cache entry.
+    id_list_params = ('tags', 'ingredients', 'recipes')
+    flag_params = ('assigned_only',)
+
+    def get_list_version(self):
+        """Return the version and modification time of the listed objects"""
+        return CollectionVersion.objects.get_version(
+            self.request.user, self.version_collection
+        )
+
+    def get_object_version(self):
+        """Return the version and modification time of the object, if any"""
+        return None
+
+    def get_normalized_params(self):
+        """Return the query params with equivalent values made equal"""
+        params = []
+
+        for name, values in sorted(self.request.query_params.lists()):
+            try:
+                if name in self.id_list_params:
+                    values = sorted({
+                        int(value) for value in ','.join(values).split(',')
+                    })
+                elif name in self.flag_params:
+                    values = [bool(int(value)) for value in values]
+            except ValueError:
+                # Left as sent, the view rejects or ignores these.
+                pass
+            params.append((name, values))
+
+        return params
+
+    def get_etag(self, version):
+        """Return the ETag of the response for the given version"""
+        request = self.request
+        key = repr((
+            request.user.pk,
+            request.get_host(),
+            self.action,
+            sorted(self.kwargs.items()),
+            self.get_normalized_params(),
+            request.accepted_renderer.media_type,
+            version,
+        ))
+
+        return quote_etag(hashlib.sha1(key.encode()).hexdigest())
+
+    def conditional_response(self, version, handler, *args, **kwargs):
+        """Return 304 if the client has the current version, else handle"""
+        version, modified = version
+        etag = self.get_etag(version)
+        last_modified = int(modified.timestamp()) if modified else None
+
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            # The version is read before the query, so a write in between
+            # only makes the next request miss rather than serve stale data.
+            response = self.cached_response(etag, handler, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+
+        return response
+
+    def cached_response(self, key, handler, *args, **kwargs):
+        """Return the cached response for the key, else handle and cache"""
+        if not self.response_cache.enabled:
+            return handler(*args, **kwargs)
+
+        data = self.response_cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(*args, **kwargs)
+        if response.status_code == 200:
+            self.response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_version(), super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        version = self.get_object_version()
+        if version is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        return self.conditional_response(
+            version, super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,105 @@
+"""
+Streaming exports of recipe libraries
+"""
+import csv
+from itertools import (
+    count,
+    islice,
+)
+
+from django.db import connections
+from django.db.models import prefetch_related_objects
+
+from core.renderers import ORJSONRenderer
+
+
+CSV_COLUMNS = (
+    'id',
+    'title',
+    'time_minutes',
+    'price',
+    'link',
+    'description',
+    'image',
+    'tags',
+    'ingredients',
+)
+# Joins the tag and ingredient names within a CSV cell.
+CSV_NAME_SEPARATOR = '; '
+
+
+class _Echo:
+    """File-like object returning what is written, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, chunk_size):
+    """Yield lists of recipes read through a server-side cursor
+
+    The tags and ingredients of each chunk are loaded with one query each,
+    as ``iterator()`` ignores ``prefetch_related()``.
+    """
+    if connections[queryset.db].settings_dict['DISABLE_SERVER_SIDE_CURSORS']:
+        chunks = _iter_pages(queryset, chunk_size)
+    else:
+        recipes = queryset.iterator(chunk_size=chunk_size)
+        chunks = iter(lambda: list(islice(recipes, chunk_size)), [])
+
+    for chunk in chunks:
+        prefetch_related_objects(chunk, 'tags', 'ingredients')
+        yield chunk
+
+
+def _iter_pages(queryset, chunk_size):
+    """Yield lists of recipes a query at a time, without a cursor"""
+    # Without server-side cursors, as behind pgbouncer in transaction mode,
+    # iterator() would read the whole result at once.
+    if queryset.query.order_by == ('-id',):
+        chunk = list(queryset[:chunk_size])
+        while chunk:
+            yield chunk
+            chunk = list(
+                queryset.filter(id__lt=chunk[-1].id)[:chunk_size]
+            )
+    else:
+        for offset in count(0, chunk_size):
+            chunk = list(queryset[offset:offset + chunk_size])
+            if not chunk:
+                return
+            yield chunk
+
+
+def iter_rows(queryset, serializer_class, context, chunk_size):
+    """Yield the serialized recipes, a chunk at a time"""
+    for chunk in iter_chunks(queryset, chunk_size):
+        yield from serializer_class(chunk, many=True, context=context).data
+
+
+def ndjson_lines(rows):
+    """Yield each row as a line of JSON"""
+    renderer = ORJSONRenderer()
+
+    for row in rows:
+        yield renderer.render(row) + b'\n'
+
+
+def csv_lines(rows):
+    """Yield a header line, then each row as a line of CSV"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+
+    for row in rows:
+        yield writer.writerow([
+            CSV_NAME_SEPARATOR.join(item['name'] for item in row[column])
+            if column in ('tags', 'ingredients') else row[column]
+            for column in CSV_COLUMNS
+        ])
+
+
+# Media type, file extension and line writer of each export format.
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', ndjson_lines),
+    'csv': ('text/csv', 'csv', csv_lines),
+}
@@ -0,0 +1,89 @@
+"""
+Facet counts of filtered recipes
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import (
+    Count,
+    Q,
+)
+
+from core.models import Recipe
+
+
+def bucket_ranges(bounds):
+    """Return the (min, max) ranges split at the bounds, open ended"""
+    edges = [None, *bounds, None]
+
+    return list(zip(edges, edges[1:]))
+
+
+def range_facets():
+    """Return the bucket ranges of each range facet"""
+    return {
+        'time_minutes': bucket_ranges(settings.RECIPE_FACET_TIME_BOUNDS),
+        'price': bucket_ranges(
+            [Decimal(bound) for bound in settings.RECIPE_FACET_PRICE_BOUNDS]
+        ),
+    }
+
+
+def range_filter(field, low, high):
+    """Return the filter of a bucket, including its min but not its max"""
+    conditions = {}
+    if low is not None:
+        conditions[f'{field}__gte'] = low
+    if high is not None:
+        conditions[f'{field}__lt'] = high
+
+    return Q(**conditions) if conditions else None
+
+
+def range_counts(recipes):
+    """Return the total and the count of each bucket in one query"""
+    facets = range_facets()
+    aggregates = {'total': Count('id')}
+    for field, ranges in facets.items():
+        for i, (low, high) in enumerate(ranges):
+            aggregates[f'{field}_{i}'] = Count(
+                'id', filter=range_filter(field, low, high)
+            )
+
+    counts = recipes.order_by().aggregate(**aggregates)
+    result = {'total': counts['total']}
+    for field, ranges in facets.items():
+        result[field] = [
+            {'min': low, 'max': high, 'count': counts[f'{field}_{i}']}
+            for i, (low, high) in enumerate(ranges)
+        ]
+
+    return result
+
+
+def attr_counts(recipes, field_name, limit):
+    """Return the tags or ingredients of the recipes, most matched first"""
+    field = Recipe._meta.get_field(field_name)
+    attr = field.m2m_reverse_field_name()
+    rows = field.remote_field.through.objects.filter(
+        recipe_id__in=recipes.order_by().values('id')
+    ).values_list(
+        f'{attr}_id', f'{attr}__name',
+    ).annotate(
+        count=Count('*'),
+    ).order_by('-count', f'{attr}__name')[:limit]
+
+    return [
+        {'id': pk, 'name': name, 'count': count} for pk, name, count in rows
+    ]
+
+
+def facet_counts(recipes):
+    """Return every facet of the recipes, in three grouped queries"""
+    facets = range_counts(recipes)
+    for field_name in ('tags', 'ingredients'):
+        facets[field_name] = attr_counts(
+            recipes, field_name, settings.RECIPE_FACET_MAX_VALUES
+        )
+
+    return facets
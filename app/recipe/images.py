@@ -0,0 +1,124 @@
+"""
+Resized derivatives of recipe images
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import (
+    Image,
+    ImageOps,
+)
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import (
+    connections,
+    transaction,
+)
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Recipe
+
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes for each derivative, which keeps the aspect ratio.
+DERIVATIVE_SIZES = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+}
+DERIVATIVE_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+
+_executor = None
+
+
+def get_executor():
+    """Return the worker pool used to generate derivatives"""
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-image',
+        )
+
+    return _executor
+
+
+def schedule_derivatives(recipe, stale_derivatives=None):
+    """Generate derivatives for the recipe image after the upload commits"""
+    args = (recipe.id, recipe.image.name, stale_derivatives or {})
+
+    if settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(_run_in_worker, *args)
+        )
+    else:
+        transaction.on_commit(lambda: update_derivatives(*args))
+
+
+def _run_in_worker(*args):
+    try:
+        update_derivatives(*args)
+    except Exception:
+        logger.exception('Failed to generate derivatives for %s', args[1])
+    finally:
+        # Database connections are per thread, so close this worker's own.
+        connections.close_all()
+
+
+def update_derivatives(recipe_id, image_name, stale_derivatives):
+    """Replace the stored derivatives of a recipe image"""
+    delete_derivatives(stale_derivatives)
+    derivatives = generate_derivatives(image_name)
+
+    # Skip recipes whose image was replaced while this one was processed.
+    updated = Recipe.objects.filter(
+        id=recipe_id, image=image_name
+    ).update(
+        image_derivatives=derivatives,
+        version=F('version') + 1,
+        modified=timezone.now(),
+    )
+
+    if not updated:
+        delete_derivatives(derivatives)
+
+
+def generate_derivatives(image_name):
+    """Save resized copies of an image and return their storage names"""
+    base_name = os.path.splitext(image_name)[0]
+    derivatives = {}
+
+    with default_storage.open(image_name) as image_file:
+        with Image.open(image_file) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+
+    for size_name, size in DERIVATIVE_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail(size, Image.Resampling.LANCZOS)
+
+        for ext, image_format in DERIVATIVE_FORMATS.items():
+            content = BytesIO()
+            resized.save(content, image_format, quality=85)
+            name = default_storage.save(
+                f'{base_name}_{size_name}.{ext}',
+                ContentFile(content.getvalue()),
+            )
+            derivatives.setdefault(size_name, {})[ext] = name
+
+    return derivatives
+
+
+def delete_derivatives(derivatives):
+    """Delete derivative files from storage"""
+    for formats in derivatives.values():
+        for name in formats.values():
+            default_storage.delete(name)
@@ -0,0 +1,166 @@
+"""
+Pagination for the recipe app
+"""
+import json
+from base64 import (
+    urlsafe_b64decode,
+    urlsafe_b64encode,
+)
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ValidationError,
+)
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+def _invert(field):
+    """Return the ordering field with its direction flipped"""
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class KeysetPagination(CursorPagination):
+    """Paginate by seeking past the last row seen instead of an OFFSET.
+
+    The queryset's own ordering is used as the key, so the last ordering
+    field must be unique (e.g. ``-id``) for pages to be stable.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering already applied to the queryset"""
+        return tuple(queryset.query.order_by) or ('-pk',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        if self.reverse:
+            queryset = queryset.order_by(*map(_invert, self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.position is not None:
+            # Cursors come from the client, so values of the wrong type are
+            # rejected like undecodable cursors rather than failing queries.
+            try:
+                self.position = self._parse_position(queryset)
+                queryset = queryset.filter(self._seek_filter())
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        return self.page
+
+    def _parse_position(self, queryset):
+        """Return the cursor position as values of the ordering fields"""
+        position = []
+        for field_name, value in zip(self.ordering, self.position):
+            if value is None:
+                raise ValueError('Cursor values cannot be null.')
+            field = self._ordering_field(queryset, field_name.lstrip('-'))
+            position.append(value if field is None else field.to_python(value))
+
+        return position
+
+    def _ordering_field(self, queryset, name):
+        """Return the model or annotation field ordered by, if known"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+
+        opts = queryset.model._meta
+        try:
+            return opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _seek_filter(self):
+        """Return a filter matching rows after the cursor position"""
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            descending = field.startswith('-') != self.reverse
+            lookup = 'lt' if descending else 'gt'
+            equal = {
+                prev.lstrip('-'): value
+                for prev, value in zip(self.ordering[:i], self.position)
+            }
+            conditions.append(Q(
+                **equal,
+                **{f'{field.lstrip("-")}__{lookup}': self.position[i]},
+            ))
+
+        return reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        return [getattr(instance, field.lstrip('-')) for field in ordering]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+
+        position = self._get_position_from_instance(
+            self.page[-1], self.ordering
+        )
+        return self.encode_cursor((position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+
+        position = self._get_position_from_instance(
+            self.page[0], self.ordering
+        )
+        return self.encode_cursor((position, True))
+
+    def decode_cursor(self, request):
+        """Return the (position, reverse) pair encoded in the request"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            position, reverse = json.loads(
+                urlsafe_b64decode(encoded.encode('ascii'))
+            )
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, bool(reverse)
+
+    def encode_cursor(self, cursor):
+        """Return the current URL with the cursor replaced"""
+        encoded = urlsafe_b64encode(
+            json.dumps(cursor, separators=(',', ':'), default=str).encode()
+        ).decode('ascii')
+
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
@@ -1,17 +1,72 @@
 """
 Recipe serializers
 """
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.translation import gettext as _
 
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 
 from core.models import (
     Recipe,
+    RecipeImageUpload,
     Tag,
     Ingredient,
 )
+from core.signals import recipes_bulk_changed
+
+
+def get_or_create_attrs(model, user, names):
+    """Return the user's objects by name, creating any missing"""
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+
+    objs = {
+        obj.name: obj
+        for obj in model.objects.filter(user=user, name__in=names)
+    }
+    missing = [name for name in names if name not in objs]
+
+    if missing:
+        # Rows created by a concurrent request are skipped by the
+        # insert and picked up by the select that follows.
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        objs.update(
+            (obj.name, obj) for obj in model.objects.filter(
+                user=user, name__in=missing
+            )
+        )
+
+    return {name: objs[name] for name in names}
+
+
+class RecipeAttrSerializer(serializers.ModelSerializer):
+    """Base serializer for user owned recipe attributes"""
+
+    def validate_name(self, value):
+        """Reject renaming to a name the user already has"""
+        if self.instance is not None:
+            duplicates = self.Meta.model.objects.filter(
+                user=self.instance.user,
+                name=value,
+            ).exclude(id=self.instance.id)
+
+            if duplicates.exists():
+                msg = _('An item with this name already exists')
+                raise serializers.ValidationError(msg)
 
+        return value
 
-class IngredientSerializer(serializers.ModelSerializer):
+
+class IngredientSerializer(RecipeAttrSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
@@ -20,7 +75,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(RecipeAttrSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -29,10 +84,40 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Serializer that can drop fields and show relations as ID lists
+
+    ``fields`` limits the output to the named fields.  ``expand`` names the
+    relations in ``id_list_sources`` to nest, the others are read as lists
+    of IDs from the attribute named in ``id_list_sources``.
+    """
+    id_list_sources = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        if expand is not None:
+            for name, source in self.id_list_sources.items():
+                if name in self.fields and name not in expand:
+                    self.fields[name] = serializers.ListField(
+                        child=serializers.IntegerField(),
+                        source=source,
+                        read_only=True,
+                    )
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipe objects"""
     tags = TagSerializer(many=True, required=False)
     ingredients = IngredientSerializer(many=True, required=False)
+    id_list_sources = {
+        'tags': 'tag_ids',
+        'ingredients': 'ingredient_ids',
+    }
 
     class Meta:
         model = Recipe
@@ -47,45 +132,47 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
-    def _get_or_create_tags(self, recipe, tags):
-        """Create and return tags"""
-        auth_user = self.context['request'].user
+    def _get_or_create_objs(self, model, items):
+        """Return the user's objects for the given items, creating missing"""
+        objs = get_or_create_attrs(
+            model,
+            self.context['request'].user,
+            [item['name'] for item in items],
+        )
+        return list(objs.values())
 
-        for tag in tags:
-            tag_obj = Tag.objects.get_or_create(user=auth_user, **tag)[0]
-            recipe.tags.add(tag_obj)
+    def _get_or_create_tags(self, tags):
+        """Create and return tags"""
+        return self._get_or_create_objs(Tag, tags)
 
-    def _get_or_create_ingredients(self, recipe, ingredients):
+    def _get_or_create_ingredients(self, ingredients):
         """Create and return ingredients"""
-        auth_user = self.context['request'].user
-
-        for ingredient in ingredients:
-            ingredient_obj = Ingredient.objects.get_or_create(
-                user=auth_user, **ingredient
-            )[0]
-            recipe.ingredients.add(ingredient_obj)
+        return self._get_or_create_objs(Ingredient, ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_ingredients(recipe, ingredients)
-        self._get_or_create_tags(recipe, tags)
+        recipe.ingredients.add(*self._get_or_create_ingredients(ingredients))
+        recipe.tags.add(*self._get_or_create_tags(tags))
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
-        ingredients = validated_data.pop('ingredients', [])
+        ingredients = validated_data.pop('ingredients', None)
 
+        # set() only inserts and deletes the links that actually changed.
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(instance, ingredients)
+            instance.ingredients.set(
+                self._get_or_create_ingredients(ingredients)
+            )
 
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(instance, tags)
+            instance.tags.set(self._get_or_create_tags(tags))
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -94,12 +181,278 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
+class SimilarRecipeSerializer(RecipeSerializer):
+    """Serializer for recipes similar to another one"""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('similarity',)
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serialize a recipe detail"""
+    image_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = RecipeSerializer.Meta.fields + ('description', 'image')
+        fields = RecipeSerializer.Meta.fields + (
+            'description',
+            'image',
+            'image_derivatives',
+        )
+
+    def get_image_derivatives(self, recipe) -> dict:
+        """Return the URLs of the resized copies of the image"""
+        request = self.context.get('request')
+        derivatives = {}
+
+        for size_name, formats in recipe.image_derivatives.items():
+            for ext, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                derivatives.setdefault(size_name, {})[ext] = url
+
+        return derivatives
+
+
+class RecipeBulkCreateSerializer(RecipeSerializer):
+    """Serializer for a recipe created by a bulk request"""
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('description',)
+
+
+class RecipeBulkUpdateSerializer(RecipeBulkCreateSerializer):
+    """Serializer for a recipe changed by a bulk request"""
+    id = serializers.IntegerField()
+
+    class Meta(RecipeBulkCreateSerializer.Meta):
+        read_only_fields = ()
+        extra_kwargs = {
+            'title': {'required': False},
+            'time_minutes': {'required': False},
+            'price': {'required': False},
+        }
+
+
+class RecipeBulkSerializer(serializers.Serializer):
+    """Serializer for creating, updating and deleting recipes at once"""
+
+    def get_fields(self):
+        # Declared here as the field names clash with the serializer methods.
+        return {
+            'create': RecipeBulkCreateSerializer(many=True, required=False),
+            'update': RecipeBulkUpdateSerializer(many=True, required=False),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(),
+                required=False,
+            ),
+        }
+
+    def to_internal_value(self, data):
+        # Checked before validating the items, which is the costly part.
+        if isinstance(data, Mapping):
+            items = sum(
+                len(value) for key, value in data.items()
+                if key in self.fields and isinstance(value, list)
+            )
+            if items > settings.RECIPE_BULK_MAX_ITEMS:
+                msg = _('Ensure there are no more than %d items.') % (
+                    settings.RECIPE_BULK_MAX_ITEMS
+                )
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [msg],
+                })
+
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        """Reject unknown and repeated recipe IDs"""
+        update_ids = [item['id'] for item in attrs.get('update', [])]
+        delete_ids = attrs.get('delete', [])
+        existing = set(Recipe.objects.filter(
+            user=self.context['request'].user,
+            id__in=update_ids + delete_ids,
+        ).values_list('id', flat=True))
+        seen = set()
+        errors = {}
+
+        update_errors = []
+        for recipe_id in update_ids:
+            update_errors.append(self._id_errors(recipe_id, existing, seen))
+        if any(update_errors):
+            errors['update'] = update_errors
+
+        delete_errors = {}
+        for index, recipe_id in enumerate(delete_ids):
+            id_errors = self._id_errors(recipe_id, existing, seen)
+            if id_errors:
+                delete_errors[index] = id_errors['id']
+        if delete_errors:
+            errors['delete'] = delete_errors
+
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return attrs
+
+    def _id_errors(self, recipe_id, existing, seen):
+        """Return the errors for a recipe ID, marking it as seen"""
+        if recipe_id not in existing:
+            return {'id': [_('Recipe not found.')]}
+        if recipe_id in seen:
+            return {'id': [_('Recipe is changed more than once.')]}
+
+        seen.add(recipe_id)
+        return {}
+
+    @transaction.atomic
+    def create(self, validated_data):
+        user = self.context['request'].user
+        creates = validated_data.get('create', [])
+        updates = validated_data.get('update', [])
+        delete_ids = validated_data.get('delete', [])
+        batch_size = settings.RECIPE_BULK_BATCH_SIZE
+
+        attrs = {
+            name: get_or_create_attrs(model, user, (
+                attr['name']
+                for item in creates + updates
+                for attr in item.get(name, [])
+            ))
+            for name, model in (('tags', Tag), ('ingredients', Ingredient))
+        }
+
+        created = Recipe.objects.bulk_create(
+            [
+                Recipe(user=user, **self._recipe_fields(item))
+                for item in creates
+            ],
+            batch_size=batch_size,
+        )
+
+        recipes = Recipe.objects.defer('search_vector').select_for_update(
+        ).in_bulk([item['id'] for item in updates])
+        updated = [recipes[item['id']] for item in updates]
+        changed_fields = set()
+        for recipe, item in zip(updated, updates):
+            for key, value in self._recipe_fields(item).items():
+                setattr(recipe, key, value)
+                changed_fields.add(key)
+        changed_fields.discard('id')
+        if changed_fields:
+            Recipe.objects.bulk_update(
+                updated, sorted(changed_fields), batch_size=batch_size
+            )
+
+        for name, objs in attrs.items():
+            field = Recipe._meta.get_field(name)
+            through = field.remote_field.through
+            column = f'{field.m2m_reverse_field_name()}_id'
+
+            # Replaced links are dropped and inserted again, which takes
+            # two statements however many recipes change.
+            through.objects.filter(recipe_id__in=[
+                recipe.id
+                for recipe, item in zip(updated, updates) if name in item
+            ]).delete()
+            through.objects.bulk_create(
+                [
+                    through(recipe_id=recipe.id, **{column: objs[attr].id})
+                    for recipe, item in zip(
+                        created + updated, creates + updates
+                    )
+                    for attr in dict.fromkeys(
+                        attr['name'] for attr in item.get(name, [])
+                    )
+                ],
+                batch_size=batch_size,
+            )
+
+        self._delete_recipes(delete_ids)
+
+        # The bulk writes skip the model signals.
+        recipes_bulk_changed.send(
+            sender=Recipe,
+            user_id=user.id,
+            created=[recipe.id for recipe in created],
+            updated=[recipe.id for recipe in updated],
+            deleted=delete_ids,
+        )
+
+        return {
+            'create': [recipe.id for recipe in created],
+            'update': [recipe.id for recipe in updated],
+            'delete': delete_ids,
+        }
+
+    def _delete_recipes(self, recipe_ids):
+        """Delete recipes with a statement per table, skipping the signals"""
+        # Deleting through the collector would send pre_delete, and bump the
+        # collection versions, once per recipe.
+        RecipeImageUpload.objects.filter(recipe_id__in=recipe_ids).delete()
+        for name in ('tags', 'ingredients'):
+            through = Recipe._meta.get_field(name).remote_field.through
+            through.objects.filter(recipe_id__in=recipe_ids).delete()
+
+        recipes = Recipe.objects.filter(id__in=recipe_ids)
+        recipes._raw_delete(recipes.db)
+
+    def _recipe_fields(self, item):
+        """Return the recipe column values of a bulk request item"""
+        return {
+            key: value for key, value in item.items()
+            if key not in ('tags', 'ingredients')
+        }
+
+
+class RecipeBulkResultSerializer(serializers.Serializer):
+    """Serializer for the IDs of recipes changed by a bulk request"""
+    create = serializers.ListField(child=serializers.IntegerField())
+    update = serializers.ListField(child=serializers.IntegerField())
+    delete = serializers.ListField(child=serializers.IntegerField())
+
+
+class ShoppingListItemSerializer(serializers.Serializer):
+    """Serializer for an ingredient and the recipes it appears in"""
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient__name')
+    recipes = serializers.ListField(child=serializers.IntegerField())
+
+
+class AttrFacetSerializer(serializers.Serializer):
+    """Serializer for the number of recipes with a tag or ingredient"""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class TimeFacetSerializer(serializers.Serializer):
+    """Serializer for the number of recipes in a time_minutes bucket"""
+    min = serializers.IntegerField(allow_null=True)
+    max = serializers.IntegerField(allow_null=True)
+    count = serializers.IntegerField()
+
+
+class PriceFacetSerializer(serializers.Serializer):
+    """Serializer for the number of recipes in a price bucket"""
+    min = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    max = serializers.DecimalField(
+        max_digits=5, decimal_places=2, allow_null=True
+    )
+    count = serializers.IntegerField()
+
+
+class RecipeFacetsSerializer(serializers.Serializer):
+    """Serializer for the facet counts of filtered recipes"""
+    total = serializers.IntegerField()
+    tags = AttrFacetSerializer(many=True)
+    ingredients = AttrFacetSerializer(many=True)
+    time_minutes = TimeFacetSerializer(many=True)
+    price = PriceFacetSerializer(many=True)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -112,3 +465,31 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'image': {'required': True},
         }
+
+    def update(self, instance, validated_data):
+        # Derivatives are left out of full saves, so name the fields.
+        for key, value in validated_data.items():
+            setattr(instance, key, value)
+        instance.save(update_fields=list(validated_data))
+
+        return instance
+
+
+class RecipeImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for chunked recipe image uploads"""
+
+    class Meta:
+        model = RecipeImageUpload
+        fields = ('id', 'filename', 'size', 'offset')
+        read_only_fields = ('id', 'offset')
+
+    def validate_size(self, value):
+        """Reject empty images and those larger than the maximum"""
+        if value < 1:
+            msg = _('Image is empty')
+            raise serializers.ValidationError(msg)
+        if value > settings.RECIPE_IMAGE_MAX_SIZE:
+            msg = _('Image is too large')
+            raise serializers.ValidationError(msg)
+
+        return value
@@ -0,0 +1,244 @@
+"""
+Similar recipe lookups from MinHash signatures of tags and ingredients
+"""
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Recipe
+
+
+# Mersenne prime the hash functions are computed modulo.
+PRIME = (1 << 31) - 1
+# Fixed so every worker computes the same signatures.
+SEED = 20241022
+
+
+def load_features(recipes):
+    """Return the features of each recipe, read from the link tables
+
+    Tags are numbered evenly and ingredients oddly so their IDs do not
+    collide.
+    """
+    features = {
+        pk: set() for pk in recipes.values_list('id', flat=True)
+    }
+
+    for name, offset in (('tags', 0), ('ingredients', 1)):
+        field = Recipe._meta.get_field(name)
+        column = f'{field.m2m_reverse_field_name()}_id'
+        links = field.remote_field.through.objects.filter(
+            recipe_id__in=recipes.values('id')
+        ).values_list('recipe_id', column)
+        for recipe_id, attr_id in links:
+            # Recipes created since the IDs were read are left for later.
+            if recipe_id in features:
+                features[recipe_id].add(2 * attr_id + offset)
+
+    return features
+
+
+def jaccard(features, other):
+    """Return the Jaccard similarity of two feature sets"""
+    if not features or not other:
+        return 0.0
+
+    return len(features & other) / len(features | other)
+
+
+class MinHasher:
+    """Computes MinHash signatures, whose matching slots estimate Jaccard"""
+
+    def __init__(self, num_hashes, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_hashes = num_hashes
+        self.a = rng.integers(1, PRIME, (num_hashes, 1), dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, (num_hashes, 1), dtype=np.uint64)
+
+    def signatures(self, feature_sets, chunk_size=1024):
+        """Return the signatures of the feature sets as columns"""
+        result = np.full(
+            (self.num_hashes, len(feature_sets)), PRIME, dtype=np.uint32
+        )
+
+        for start in range(0, len(feature_sets), chunk_size):
+            chunk = feature_sets[start:start + chunk_size]
+            sizes = np.fromiter(map(len, chunk), dtype=np.int64)
+            if not sizes.any():
+                continue
+
+            values = np.fromiter(
+                (feature for features in chunk for feature in features),
+                dtype=np.uint64,
+                count=int(sizes.sum()),
+            ) % PRIME
+            hashes = (self.a * values + self.b) % PRIME
+            nonempty = np.flatnonzero(sizes)
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            result[:, start + nonempty] = np.minimum.reduceat(
+                hashes, offsets[nonempty], axis=1
+            )
+
+        return result
+
+
+class SimilarityIndex:
+    """Signatures of a user's recipes, refreshed from recent changes
+
+    Signatures are stored hash-major, one column per recipe, so a lookup
+    compares each hash across all recipes with one vectorized operation.
+    """
+
+    def __init__(self, user_id, hasher):
+        self.user_id = user_id
+        self.hasher = hasher
+        self.version = None
+        self.refreshed = None
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.signatures = np.zeros((hasher.num_hashes, 0), dtype=np.uint32)
+        self.empty = np.zeros(0, dtype=bool)
+        self.deleted = np.zeros(0, dtype=bool)
+        self.positions = {}
+        self.lock = threading.Lock()
+
+    def refresh(self, version):
+        """Bring the index up to date with the user's recipes"""
+        if self.version == version:
+            return
+
+        started = timezone.now()
+        recipes = Recipe.objects.filter(user_id=self.user_id)
+        if self.refreshed is not None:
+            # Changes are timestamped before they commit, so recipes changed
+            # shortly before the last refresh are read again.
+            recipes = recipes.filter(modified__gte=self.refreshed - timedelta(
+                seconds=settings.SIMILARITY_REFRESH_MARGIN
+            ))
+
+        self.update(list(load_features(recipes).items()))
+        if self.refreshed is not None:
+            self.drop_deleted()
+        self.refreshed = started
+        self.version = version
+
+    def update(self, recipes):
+        """Store the signatures of (recipe ID, features) pairs"""
+        if not recipes:
+            return
+
+        signatures = self.hasher.signatures(
+            [features for _, features in recipes]
+        )
+        new_ids = [pk for pk, _ in recipes if pk not in self.positions]
+        if new_ids:
+            start = len(self.ids)
+            self.ids = np.concatenate((self.ids, new_ids))
+            self.signatures = np.concatenate((
+                self.signatures,
+                np.zeros((self.hasher.num_hashes, len(new_ids)), np.uint32),
+            ), axis=1)
+            self.empty = np.concatenate(
+                (self.empty, np.ones(len(new_ids), dtype=bool))
+            )
+            self.deleted = np.concatenate(
+                (self.deleted, np.zeros(len(new_ids), dtype=bool))
+            )
+            self.positions.update(
+                (pk, position) for position, pk in enumerate(new_ids, start)
+            )
+
+        columns = [self.positions[pk] for pk, _ in recipes]
+        self.signatures[:, columns] = signatures
+        self.empty[columns] = [not features for _, features in recipes]
+
+    def drop_deleted(self):
+        """Mark recipes deleted since the index was built as empty"""
+        if not len(self.ids):
+            return
+
+        # Recipes created since the refresh read its changes have higher IDs
+        # and are left out of the count.
+        live = len(self.positions) - int(self.deleted.sum())
+        current = Recipe.objects.filter(
+            user_id=self.user_id, id__lte=int(self.ids.max())
+        ).count()
+        if live <= current:
+            return
+
+        existing = set(Recipe.objects.filter(
+            user_id=self.user_id
+        ).values_list('id', flat=True))
+        for pk, position in self.positions.items():
+            if pk not in existing:
+                self.deleted[position] = True
+                self.empty[position] = True
+
+    def candidates(self, recipe_id, count):
+        """Return the IDs of the recipes most similar to the given one"""
+        # A concurrent refresh replaces the arrays one at a time.
+        with self.lock:
+            return self._candidates(recipe_id, count)
+
+    def _candidates(self, recipe_id, count):
+        """Return the most similar recipe IDs, with the lock held"""
+        position = self.positions.get(recipe_id)
+        if position is None or self.empty[position] or count <= 0:
+            return []
+
+        target = self.signatures[:, position]
+        scores = np.zeros(len(self.ids), dtype=np.uint16)
+        for row, value in zip(self.signatures, target):
+            scores += row == value
+        scores[self.empty] = 0
+        scores[position] = 0
+
+        count = min(count, int(np.count_nonzero(scores)))
+        if not count:
+            return []
+        ranks = -scores.astype(np.int32)
+        best = np.argpartition(ranks, count - 1)[:count]
+        best = best[np.argsort(ranks[best], kind='stable')]
+
+        return self.ids[best].tolist()
+
+
+class SimilarityCache:
+    """Per-process LRU of the similarity indexes of recently active users"""
+
+    def __init__(self, max_users, num_hashes):
+        self.max_users = max_users
+        self.hasher = MinHasher(num_hashes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_index(self, user_id, version):
+        """Return the user's index, refreshed to the collection version"""
+        with self._lock:
+            index = self._entries.get(user_id)
+            if index is None:
+                index = SimilarityIndex(user_id, self.hasher)
+                self._entries[user_id] = index
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+        with index.lock:
+            index.refresh(version)
+
+        return index
+
+    def clear(self):
+        """Drop every cached index"""
+        with self._lock:
+            self._entries.clear()
+
+
+similarity_cache = SimilarityCache(
+    max_users=settings.SIMILARITY_CACHE_USERS,
+    num_hashes=settings.SIMILARITY_NUM_HASHES,
+)
@@ -0,0 +1,111 @@
+"""
+Tests for autocompleting tag and ingredient names
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+from recipe.autocomplete import autocomplete_cache
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class AutocompleteApiTests(TestCase):
+    """Test autocompleting names"""
+
+    def setUp(self):
+        autocomplete_cache.clear()
+        self.addCleanup(autocomplete_cache.clear)
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_tags(self, *names):
+        """Create tags, each used by one more recipe than the last"""
+        recipes = []
+        for name in names:
+            recipes.append(Recipe.objects.create(
+                user=self.user,
+                title='Sample recipe',
+                time_minutes=5,
+                price=Decimal('5.00'),
+            ))
+            tag = Tag.objects.create(user=self.user, name=name)
+            tag.recipe_set.add(*recipes)
+
+    def complete(self, url=TAGS_AUTOCOMPLETE_URL, **params):
+        """Return the names matching the params"""
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [item['name'] for item in res.data]
+
+    def test_prefix_matches_first(self):
+        """Test prefix matches come first, most used first"""
+        self.create_tags('Vegan', 'Vegetarian', 'Savory veggies', 'Quick')
+
+        self.assertEqual(
+            self.complete(q='veg'),
+            ['Vegetarian', 'Vegan', 'Savory veggies'],
+        )
+        self.assertEqual(self.complete(q='VEG', limit=1), ['Vegetarian'])
+
+    def test_matches_from_database(self):
+        """Test the database returns the same matches as the cache"""
+        self.create_tags('Vegan', 'Vegetarian', 'Savory veggies', 'Quick')
+
+        with patch.object(autocomplete_cache, 'max_users', 0):
+            self.assertEqual(
+                self.complete(q='veg'),
+                ['Vegetarian', 'Vegan', 'Savory veggies'],
+            )
+
+    def test_cache_refreshed_after_changes(self):
+        """Test new names are matched once the collection changes"""
+        self.create_tags('Vegan')
+        self.assertEqual(self.complete(q='veg'), ['Vegan'])
+
+        self.create_tags('Vegetarian')
+
+        with self.assertNumQueries(2):
+            self.assertEqual(self.complete(q='veg'), ['Vegan', 'Vegetarian'])
+        # Served from the cache after checking the version.
+        with self.assertNumQueries(1):
+            self.complete(q='vega')
+
+    def test_limited_to_user(self):
+        """Test only the user's names are matched"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        Ingredient.objects.create(user=other_user, name='Salt')
+        Ingredient.objects.create(user=self.user, name='Salmon')
+
+        self.assertEqual(
+            self.complete(INGREDIENTS_AUTOCOMPLETE_URL, q='sal'),
+            ['Salmon'],
+        )
+
+    def test_invalid_params(self):
+        """Test a missing text or invalid limit is rejected"""
+        for params in ({}, {'q': 'veg', 'limit': 0}, {'q': 'a', 'limit': 'x'}):
+            res = self.client.get(TAGS_AUTOCOMPLETE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,229 @@
+"""
+Tests for the bulk recipe API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    CollectionVersion,
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class BulkRecipeApiTests(TestCase):
+    """Test creating, updating and deleting recipes in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create(self):
+        """Test creating recipes with shared tags and ingredients"""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {
+            'create': [
+                {
+                    'title': 'Curry',
+                    'time_minutes': 30,
+                    'price': '7.50',
+                    'description': 'Simmered slowly',
+                    'tags': [{'name': 'Vegan'}, {'name': 'Spicy'}],
+                    'ingredients': [{'name': 'Rice'}],
+                },
+                {
+                    'title': 'Chili',
+                    'time_minutes': 45,
+                    'price': '6.00',
+                    'tags': [{'name': 'Spicy'}, {'name': 'Spicy'}],
+                },
+            ],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['update'], [])
+        self.assertEqual(res.data['delete'], [])
+        curry, chili = (
+            Recipe.objects.get(id=recipe_id)
+            for recipe_id in res.data['create']
+        )
+        self.assertEqual(curry.user, self.user)
+        self.assertEqual(curry.title, 'Curry')
+        self.assertEqual(curry.description, 'Simmered slowly')
+        self.assertEqual(chili.description, '')
+        self.assertEqual(
+            set(curry.tags.values_list('name', flat=True)),
+            {'Vegan', 'Spicy'},
+        )
+        self.assertIn(existing, curry.tags.all())
+        self.assertEqual(curry.ingredients.get().name, 'Rice')
+        self.assertEqual(list(chili.tags.values_list('name', flat=True)),
+                         ['Spicy'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update_and_delete(self):
+        """Test updating and deleting recipes in the same request"""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        kept = create_recipe(self.user, title='Kept tags')
+        kept.tags.add(tag)
+        retagged = create_recipe(self.user, title='Retagged')
+        retagged.tags.add(tag)
+        removed = create_recipe(self.user)
+        payload = {
+            'update': [
+                {'id': kept.id, 'title': 'Renamed', 'description': 'New'},
+                {'id': retagged.id, 'tags': [{'name': 'New'}]},
+            ],
+            'delete': [removed.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['update'], [kept.id, retagged.id])
+        self.assertEqual(res.data['delete'], [removed.id])
+        kept.refresh_from_db()
+        retagged.refresh_from_db()
+        self.assertEqual(kept.title, 'Renamed')
+        self.assertEqual(kept.description, 'New')
+        self.assertEqual(list(kept.tags.all()), [tag])
+        self.assertEqual(retagged.title, 'Retagged')
+        self.assertEqual(
+            list(retagged.tags.values_list('name', flat=True)), ['New']
+        )
+        self.assertFalse(Recipe.objects.filter(id=removed.id).exists())
+        self.assertFalse(
+            Recipe.tags.through.objects.filter(recipe_id=removed.id).exists()
+        )
+
+    def test_bulk_bumps_versions(self):
+        """Test bulk writes invalidate cached recipes and lists"""
+        recipe = create_recipe(self.user)
+        version = CollectionVersion.objects.get_version(
+            self.user, CollectionVersion.RECIPES
+        )[0]
+        payload = {
+            'create': [
+                {'title': 'New', 'time_minutes': 5, 'price': '1.00'},
+            ],
+            'update': [{'id': recipe.id, 'title': 'Changed'}],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 2)
+        self.assertGreater(
+            CollectionVersion.objects.get_version(
+                self.user, CollectionVersion.RECIPES
+            )[0],
+            version,
+        )
+
+    def test_bulk_invalid_item_writes_nothing(self):
+        """Test one invalid item rejects the whole request"""
+        payload = {
+            'create': [
+                {'title': 'Valid', 'time_minutes': 5, 'price': '1.00'},
+                {'title': 'Invalid', 'time_minutes': 'soon'},
+            ],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['create'][0], {})
+        self.assertIn('time_minutes', res.data['create'][1])
+        self.assertIn('price', res.data['create'][1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_other_users_recipes_rejected(self):
+        """Test recipes of other users cannot be updated or deleted"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        recipe = create_recipe(other_user)
+        own = create_recipe(self.user)
+        payload = {
+            'update': [
+                {'id': own.id, 'title': 'Changed'},
+                {'id': recipe.id, 'title': 'Changed'},
+            ],
+            'delete': [recipe.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['update'][0], {})
+        self.assertIn('id', res.data['update'][1])
+        self.assertIn(0, res.data['delete'])
+        own.refresh_from_db()
+        self.assertEqual(own.title, 'Sample recipe')
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_repeated_recipe_rejected(self):
+        """Test a recipe cannot be changed twice in one request"""
+        recipe = create_recipe(self.user)
+        payload = {
+            'update': [{'id': recipe.id, 'title': 'Changed'}],
+            'delete': [recipe.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(0, res.data['delete'])
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    @override_settings(RECIPE_BULK_MAX_ITEMS=2)
+    def test_bulk_too_many_items(self):
+        """Test requests over the item limit are rejected"""
+        recipe = create_recipe(self.user)
+        payload = {
+            'create': [
+                {'title': 'New', 'time_minutes': 5, 'price': '1.00'},
+                {'title': 'New', 'time_minutes': 5, 'price': '1.00'},
+            ],
+            'delete': [recipe.id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', res.data)
+        self.assertEqual(Recipe.objects.count(), 1)
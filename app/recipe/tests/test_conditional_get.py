@@ -0,0 +1,167 @@
+"""
+Tests for conditional GET on the recipe API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test answering unchanged requests with 304 Not Modified"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def assertNotModified(self, url, etag, params=None):
+        """Assert the URL answers 304 for the ETag with a single query"""
+        with self.assertNumQueries(1):
+            res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def assertModified(self, url, etag, params=None):
+        """Assert the URL answers with a new body for the ETag"""
+        res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_not_modified(self):
+        """Test an unchanged recipe list is answered with 304"""
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', res)
+        self.assertIn('Accept', res['Vary'])
+        self.assertNotModified(RECIPES_URL, res['ETag'])
+
+    def test_list_modified_since(self):
+        """Test If-Modified-Since is answered when no ETag is sent"""
+        res = self.client.get(RECIPES_URL)
+
+        res = self.client.get(
+            RECIPES_URL, HTTP_IF_MODIFIED_SINCE=res['Last-Modified']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_changes_with_params(self):
+        """Test different filters get different ETags"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        self.assertModified(RECIPES_URL, etag, {'tags': '1'})
+
+    def test_list_modified_after_create(self):
+        """Test creating a recipe changes the list ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        create_recipe(self.user, title='Another recipe')
+
+        self.assertModified(RECIPES_URL, etag)
+
+    def test_list_modified_after_link(self):
+        """Test linking a tag changes the list ETag"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(RECIPES_URL)['ETag']
+
+        tag.recipe_set.add(self.recipe)
+
+        self.assertModified(RECIPES_URL, etag)
+
+    def test_list_other_user_change(self):
+        """Test changes by another user keep the list ETag"""
+        etag = self.client.get(RECIPES_URL)['ETag']
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+
+        create_recipe(other_user)
+
+        self.assertNotModified(RECIPES_URL, etag)
+
+    def test_detail_not_modified(self):
+        """Test an unchanged recipe is answered with 304"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        create_recipe(self.user, title='Another recipe')
+
+        self.assertNotModified(url, etag)
+
+    def test_detail_modified_after_update(self):
+        """Test updating the recipe changes its ETag"""
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.recipe.title = 'New title'
+        self.recipe.save()
+
+        self.assertModified(url, etag)
+
+    def test_detail_modified_after_ingredient_rename(self):
+        """Test renaming a linked ingredient changes the recipe ETag"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe.ingredients.add(ingredient)
+        url = detail_url(self.recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        ingredient.name = 'Sea salt'
+        ingredient.save()
+
+        self.assertModified(url, etag)
+
+    def test_detail_missing(self):
+        """Test a missing recipe is still a 404"""
+        res = self.client.get(detail_url(self.recipe.id + 1))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_list_modified_after_recipe_delete(self):
+        """Test deleting a recipe changes the assigned tags ETag"""
+        self.recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        params = {'assigned_only': 1}
+        etag = self.client.get(TAGS_URL, params)['ETag']
+
+        self.recipe.delete()
+
+        self.assertModified(TAGS_URL, etag, params)
@@ -0,0 +1,199 @@
+"""
+Tests for exporting recipes
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    override_settings,
+    TestCase,
+    TransactionTestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from app.asgi import application
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ExportApiTests(TestCase):
+    """Test streaming exports of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def create_recipes(self, count):
+        """Create recipes, each with a tag and ingredient"""
+        for i in range(count):
+            recipe = create_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Tag {i}')
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'Salt {i}')
+            )
+
+    def test_export_ndjson(self):
+        """Test exporting recipes as JSON lines"""
+        self.create_recipes(3)
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other_user)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        self.assertIn('recipes.ndjson', res['Content-Disposition'])
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Recipe 2', 'Recipe 1', 'Recipe 0'],
+        )
+        self.assertEqual(rows[0]['price'], '5.00')
+        self.assertEqual(rows[0]['tags'][0]['name'], 'Tag 2')
+        self.assertEqual(rows[0]['ingredients'][0]['name'], 'Salt 2')
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV"""
+        recipe = create_recipe(self.user, title='Curry, mild')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Vegan'),
+            Tag.objects.create(user=self.user, name='Quick'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'file_format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        row = next(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(row['title'], 'Curry, mild')
+        self.assertEqual(row['price'], '5.00')
+        self.assertEqual(set(row['tags'].split('; ')), {'Vegan', 'Quick'})
+        self.assertEqual(row['ingredients'], '')
+
+    def test_export_filtered(self):
+        """Test the recipe filters apply to exports"""
+        self.create_recipes(2)
+        tag = Tag.objects.get(name='Tag 0')
+
+        res = self.client.get(EXPORT_URL, {'tags': tag.id})
+
+        rows = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(json.loads(rows[0])['title'], 'Recipe 0')
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_queries_per_chunk(self):
+        """Test tags and ingredients are loaded once per chunk"""
+        self.create_recipes(5)
+        res = self.client.get(EXPORT_URL)
+
+        # One cursor over the recipes, then tags and ingredients for each
+        # of the three chunks.
+        with self.assertNumQueries(7):
+            rows = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(rows), 5)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_without_server_side_cursors(self):
+        """Test exports are read a page at a time behind pgbouncer"""
+        self.create_recipes(5)
+        settings_dict = connection.settings_dict
+        self.addCleanup(
+            settings_dict.__setitem__, 'DISABLE_SERVER_SIDE_CURSORS', False
+        )
+        settings_dict['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+        for params in ({}, {'search': 'recipe'}):
+            res = self.client.get(EXPORT_URL, params)
+            rows = b''.join(res.streaming_content).splitlines()
+
+            self.assertEqual(
+                {json.loads(row)['title'] for row in rows},
+                {f'Recipe {i}' for i in range(5)},
+            )
+
+    def test_export_invalid_format(self):
+        """Test unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'file_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AsgiExportTests(TransactionTestCase):
+    """Test streaming exports from the ASGI application"""
+
+    def test_export_streamed(self):
+        """Test the export queries run outside the event loop"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        create_recipe(user, title='Curry')
+        token = Token.objects.create(user=user)
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': EXPORT_URL,
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {token.key}'.encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(application)(scope, receive, send)
+
+        self.assertEqual(messages[0]['status'], status.HTTP_200_OK)
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertEqual(json.loads(body)['title'], 'Curry')
+        self.assertNotIn('more_body', messages[-1])
@@ -0,0 +1,143 @@
+"""
+Tests for the facet counts of recipes
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+from recipe.cache import response_cache
+
+
+FACETS_URL = reverse('recipe:recipe-facets')
+
+
+def create_recipe(user, time_minutes=10, price='5.00', tags=(),
+                  ingredients=()):
+    """Create and return a sample recipe"""
+    recipe = Recipe.objects.create(
+        user=user,
+        title='Sample recipe',
+        time_minutes=time_minutes,
+        price=Decimal(price),
+    )
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+
+    return recipe
+
+
+@override_settings(
+    RECIPE_FACET_TIME_BOUNDS=[15, 30],
+    RECIPE_FACET_PRICE_BOUNDS=['10.00'],
+)
+class FacetsApiTests(TestCase):
+    """Test counting recipes by filter value"""
+
+    def setUp(self):
+        response_cache.cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.tofu = Ingredient.objects.create(user=self.user, name='Tofu')
+        create_recipe(
+            self.user, 10, '4.00', [self.vegan, self.quick], [self.tofu]
+        )
+        create_recipe(self.user, 20, '12.00', [self.vegan], [self.tofu])
+        create_recipe(self.user, 45, '10.00', [self.quick])
+
+    def test_facets(self):
+        """Test every facet is counted over the user's recipes"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        create_recipe(other_user, tags=[
+            Tag.objects.create(user=other_user, name='Vegan'),
+        ])
+
+        # The collection version, the range buckets, then tags and
+        # ingredients.
+        with self.assertNumQueries(4):
+            res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total'], 3)
+        self.assertEqual(res.data['tags'], [
+            {'id': self.quick.id, 'name': 'Quick', 'count': 2},
+            {'id': self.vegan.id, 'name': 'Vegan', 'count': 2},
+        ])
+        self.assertEqual(res.data['ingredients'], [
+            {'id': self.tofu.id, 'name': 'Tofu', 'count': 2},
+        ])
+        self.assertEqual(res.data['time_minutes'], [
+            {'min': None, 'max': 15, 'count': 1},
+            {'min': 15, 'max': 30, 'count': 1},
+            {'min': 30, 'max': None, 'count': 1},
+        ])
+        self.assertEqual(res.data['price'], [
+            {'min': None, 'max': '10.00', 'count': 1},
+            {'min': '10.00', 'max': None, 'count': 2},
+        ])
+
+    def test_facets_filtered(self):
+        """Test the facets count the recipes matching the filters"""
+        res = self.client.get(FACETS_URL, {'tags': self.vegan.id})
+
+        self.assertEqual(res.data['total'], 2)
+        self.assertEqual(
+            [(item['name'], item['count']) for item in res.data['tags']],
+            [('Vegan', 2), ('Quick', 1)],
+        )
+        self.assertEqual(
+            [item['count'] for item in res.data['time_minutes']],
+            [1, 1, 0],
+        )
+
+    def test_facets_search(self):
+        """Test the facets honour the search query"""
+        res = self.client.get(FACETS_URL, {'search': 'nothing like it'})
+
+        self.assertEqual(res.data['total'], 0)
+        self.assertEqual(res.data['tags'], [])
+
+    @override_settings(RECIPE_FACET_MAX_VALUES=1)
+    def test_facets_values_limited(self):
+        """Test only the most matched tags and ingredients are listed"""
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(
+            [item['name'] for item in res.data['tags']], ['Quick']
+        )
+
+    def test_facets_cached(self):
+        """Test repeated requests are served from the response cache"""
+        params = {'tags': self.vegan.id}
+        self.client.get(FACETS_URL, params)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(FACETS_URL, params)
+
+        self.assertEqual(res.data['total'], 2)
+
+        create_recipe(self.user, tags=[self.vegan])
+        res = self.client.get(FACETS_URL, params)
+
+        self.assertEqual(res.data['total'], 3)
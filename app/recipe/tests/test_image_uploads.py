@@ -0,0 +1,242 @@
+"""
+Tests for chunked recipe image uploads
+"""
+import os
+from datetime import timedelta
+from decimal import Decimal
+from io import (
+    BytesIO,
+    StringIO,
+)
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    RecipeImageUpload,
+)
+
+
+def uploads_url(recipe_id):
+    """Return URL for starting a chunked image upload"""
+    return reverse('recipe:recipe-image-uploads', args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    """Return URL for sending chunks of an image upload"""
+    return reverse(
+        'recipe:recipe-image-upload-chunk', args=[recipe_id, upload_id]
+    )
+
+
+def jpeg_bytes():
+    """Return the contents of a sample JPEG image"""
+    content = BytesIO()
+    Image.new('RGB', (300, 300), color='red').save(content, format='JPEG')
+    return content.getvalue()
+
+
+def write_partial(path, modified):
+    """Write a partial file last modified at the given time"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as partial:
+        partial.write(b'\xff\xd8\xff' + bytes(7))
+    os.utime(path, (modified.timestamp(), modified.timestamp()))
+
+
+def remove_if_exists(path):
+    """Remove a file left by a test"""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class ChunkedImageUploadTests(TestCase):
+    """Test uploading recipe images in chunks"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def tearDown(self):
+        self.recipe.refresh_from_db()
+        if self.recipe.image:
+            self.recipe.image.delete()
+        for upload in RecipeImageUpload.objects.all():
+            if os.path.exists(upload.partial_path):
+                os.remove(upload.partial_path)
+
+    def start_upload(self, size):
+        """Start an upload and return its id"""
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {'filename': 'photo.jpg', 'size': size},
+            format='json',
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def send_chunk(self, upload_id, content, start, size):
+        """Send part of the upload starting at the given offset"""
+        end = start + len(content) - 1
+        return self.client.put(
+            chunk_url(self.recipe.id, upload_id),
+            content,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{size}',
+        )
+
+    def test_upload_in_chunks(self):
+        """Test the image is attached after the last chunk"""
+        content = jpeg_bytes()
+        size = len(content)
+        upload_id = self.start_upload(size)
+        half = size // 2
+
+        res = self.send_chunk(upload_id, content[:half], 0, size)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['offset'], half)
+
+        res = self.send_chunk(upload_id, content[half:], half, size)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertIn('image', res.data)
+        with open(self.recipe.image.path, 'rb') as image_file:
+            self.assertEqual(image_file.read(), content)
+        self.assertFalse(RecipeImageUpload.objects.exists())
+
+    def test_resume_reports_offset(self):
+        """Test the received offset can be read to resume an upload"""
+        content = jpeg_bytes()
+        upload_id = self.start_upload(len(content))
+        self.send_chunk(upload_id, content[:100], 0, len(content))
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['offset'], 100)
+
+    def test_chunk_at_wrong_offset(self):
+        """Test a chunk that skips ahead is rejected"""
+        content = jpeg_bytes()
+        upload_id = self.start_upload(len(content))
+
+        res = self.send_chunk(upload_id, content[100:200], 100, len(content))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_first_chunk_not_image(self):
+        """Test an upload that does not start like an image is rejected"""
+        upload_id = self.start_upload(1000)
+
+        res = self.send_chunk(upload_id, b'not an image' * 10, 0, 1000)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        upload = RecipeImageUpload.objects.get(id=upload_id)
+        self.assertEqual(upload.offset, 0)
+
+    def test_upload_too_large(self):
+        """Test uploads above the maximum size are refused"""
+        with self.settings(RECIPE_IMAGE_MAX_SIZE=1000):
+            res = self.client.post(
+                uploads_url(self.recipe.id),
+                {'filename': 'photo.jpg', 'size': 1001},
+                format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_empty_upload_refused(self):
+        """Test uploads of zero bytes are refused"""
+        res = self.client.post(
+            uploads_url(self.recipe.id),
+            {'filename': 'photo.jpg', 'size': 0},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lost_partial_file_restarts_upload(self):
+        """Test an upload whose received bytes were lost starts over"""
+        content = jpeg_bytes()
+        size = len(content)
+        upload_id = self.start_upload(size)
+        self.send_chunk(upload_id, content[:100], 0, size)
+        os.remove(RecipeImageUpload.objects.get(id=upload_id).partial_path)
+
+        res = self.send_chunk(upload_id, content[100:200], 100, size)
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['offset'], 0)
+
+        res = self.send_chunk(upload_id, content, 0, size)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CleanImageUploadsTests(TestCase):
+    """Test expiring abandoned image uploads"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass',
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Sample recipe',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+
+    def create_upload(self, age):
+        """Create an upload with a partial file, started age seconds ago"""
+        upload = RecipeImageUpload.objects.create(
+            recipe=self.recipe, filename='photo.jpg', size=100, offset=10
+        )
+        started = timezone.now() - timedelta(seconds=age)
+        RecipeImageUpload.objects.filter(id=upload.id).update(created=started)
+        write_partial(upload.partial_path, started)
+        self.addCleanup(remove_if_exists, upload.partial_path)
+
+        return upload
+
+    def test_expired_uploads_deleted(self):
+        """Test old uploads and orphaned partial files are deleted"""
+        expired = self.create_upload(age=7200)
+        recent = self.create_upload(age=60)
+        orphaned = self.create_upload(age=7200)
+        RecipeImageUpload.objects.filter(id=orphaned.id).delete()
+
+        out = StringIO()
+        call_command('clean_image_uploads', max_age=3600, stdout=out)
+
+        self.assertFalse(
+            RecipeImageUpload.objects.filter(id=expired.id).exists()
+        )
+        self.assertFalse(os.path.exists(expired.partial_path))
+        self.assertFalse(os.path.exists(orphaned.partial_path))
+        self.assertTrue(
+            RecipeImageUpload.objects.filter(id=recent.id).exists()
+        )
+        self.assertTrue(os.path.exists(recent.partial_path))
+        self.assertIn('1 expired uploads and 1 orphaned', out.getvalue())
@@ -61,7 +61,7 @@ class PrivateIngredientApiTests(TestCase):
         serializer = IngredientSerializer(ingredients, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredients_limited_to_user(self):
         """
@@ -75,9 +75,9 @@ class PrivateIngredientApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], ingredient.name)
-        self.assertEqual(res.data[0]['id'], ingredient.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'], ingredient.id)
 
     def test_update_ingredient(self):
         """Test updating an ingredient"""
@@ -119,8 +119,8 @@ class PrivateIngredientApiTests(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_filter_ingredients_assigned_unique(self):
         """Test filtering ingredients by assigned returns unique items"""
@@ -144,4 +144,28 @@ class PrivateIngredientApiTests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_order_ingredients_by_usage(self):
+        """Test ordering ingredients with the most used first"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        eggs = Ingredient.objects.create(user=self.user, name='Eggs')
+        Ingredient.objects.create(user=self.user, name='Cheese')
+        for title in ('Omelette', 'Quiche'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=20,
+                price=Decimal('5.00'),
+            )
+            recipe.ingredients.add(eggs)
+        recipe.ingredients.add(salt)
+
+        res = self.client.get(
+            INGREDIENTS_URL, {'ordering': 'usage', 'assigned_only': 1}
+        )
+
+        self.assertEqual(
+            [ingredient['name'] for ingredient in res.data['results']],
+            ['Eggs', 'Salt'],
+        )
@@ -0,0 +1,168 @@
+"""
+Tests for keyset pagination of the recipe API
+"""
+import json
+from base64 import urlsafe_b64encode
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+
+from recipe.cache import response_cache
+from recipe.pagination import KeysetPagination
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class KeysetPaginationTests(TestCase):
+    """Test paginating list endpoints with cursors"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass',
+        )
+        self.client.force_authenticate(self.user)
+
+    def collect_pages(self, url, params):
+        """Follow next links and return the ids on each page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in res.data['results']])
+            if not res.data['next']:
+                return pages, res
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_paginated_by_id(self):
+        """Test recipe pages follow the -id ordering without gaps"""
+        ids = [create_recipe(self.user).id for _ in range(5)]
+
+        pages, _ = self.collect_pages(RECIPES_URL, {'page_size': 2})
+
+        expected = sorted(ids, reverse=True)
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+    def test_previous_link(self):
+        """Test the previous link returns the preceding page"""
+        for _ in range(5):
+            create_recipe(self.user)
+
+        pages, last = self.collect_pages(RECIPES_URL, {'page_size': 2})
+        res = self.client.get(last.data['previous'])
+
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            pages[-2],
+        )
+        self.assertIsNotNone(res.data['previous'])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_tags_paginated_by_name(self):
+        """Test tag pages follow the -name ordering without gaps"""
+        names = ['Vegan', 'Dessert', 'Breakfast', 'Spicy', 'Lunch']
+        for name in names:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        results = res.data['results']
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            results += res.data['results']
+
+        self.assertEqual(
+            [tag['name'] for tag in results],
+            sorted(names, reverse=True),
+        )
+
+    def test_search_results_paginated_by_rank(self):
+        """Test search pages seek on rank and id"""
+        for title in ('Curry', 'Curry curry', 'Green curry', 'Soup'):
+            create_recipe(self.user, title=title, description='curry night')
+
+        pages, _ = self.collect_pages(
+            RECIPES_URL, {'search': 'curry', 'page_size': 1}
+        )
+        res = self.client.get(RECIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            sum(pages, []),
+            [recipe['id'] for recipe in res.data['results']],
+        )
+
+    @patch.object(KeysetPagination, 'max_page_size', 2)
+    def test_page_size_capped(self):
+        """Test the requested page size is capped"""
+        for _ in range(3):
+            create_recipe(self.user)
+
+        res = self.client.get(RECIPES_URL, {'page_size': 10 ** 6})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404"""
+        res = self.client.get(RECIPES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_values_of_wrong_type(self):
+        """Test cursors with values of the wrong type return 404"""
+        create_recipe(self.user)
+        for url, position in (
+            (RECIPES_URL, ['abc']),
+            (RECIPES_URL, [None]),
+            (RECIPES_URL, [{'id': 1}]),
+            (TAGS_URL, [['Vegan'], 'abc']),
+        ):
+            cursor = urlsafe_b64encode(
+                json.dumps([position, False]).encode()
+            ).decode()
+
+            res = self.client.get(url, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_later_pages_constant_queries(self):
+        """Test a deep page costs the same queries as the first"""
+        for _ in range(6):
+            create_recipe(self.user)
+        pages, _ = self.collect_pages(RECIPES_URL, {'page_size': 1})
+        res = self.client.get(RECIPES_URL, {'page_size': 1})
+        for _ in range(4):
+            res = self.client.get(res.data['next'])
+        response_cache.cache.clear()
+
+        with self.assertNumQueries(4):
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.data['results'][0]['id'], pages[5][0])
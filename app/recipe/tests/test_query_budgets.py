@@ -0,0 +1,178 @@
+"""
+Tests for the number of queries issued by the recipe API
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+    Ingredient,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+# Maximum number of queries each endpoint may issue, regardless of how
+# many recipes, tags and ingredients the user owns.  Reads include the
+# version lookup for conditional GET and writes include the version bumps.
+QUERY_BUDGETS = {
+    'recipe-list': 4,
+    'recipe-detail': 4,
+    'recipe-create': 20,
+    'recipe-update': 8,
+    'recipe-bulk': 18,
+    'tag-list': 2,
+    'ingredient-list': 2,
+}
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class QueryBudgetTests(TestCase):
+    """Test endpoints issue a constant number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe_count = 0
+
+    def create_recipes(self, count):
+        """Create recipes, each with its own tags and ingredients"""
+        for _ in range(count):
+            self.recipe_count += 1
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {self.recipe_count}',
+                time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            for i in range(2):
+                recipe.tags.add(Tag.objects.create(
+                    user=self.user,
+                    name=f'Tag {self.recipe_count}-{i}',
+                ))
+                recipe.ingredients.add(Ingredient.objects.create(
+                    user=self.user,
+                    name=f'Ingredient {self.recipe_count}-{i}',
+                ))
+
+    def assertQueryBudget(self, endpoint, make_request):
+        """Assert a request stays within budget as the data grows"""
+        budget = QUERY_BUDGETS[endpoint]
+
+        for count in (1, 10):
+            self.create_recipes(count)
+            recipe = Recipe.objects.latest('id')
+            with self.assertNumQueries(budget):
+                res = make_request(recipe)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_recipe_list_budget(self):
+        """Test listing recipes does not query per recipe"""
+        self.assertQueryBudget(
+            'recipe-list',
+            lambda recipe: self.client.get(RECIPES_URL),
+        )
+
+    def test_recipe_detail_budget(self):
+        """Test retrieving a recipe does not query per tag or ingredient"""
+        self.assertQueryBudget(
+            'recipe-detail',
+            lambda recipe: self.client.get(detail_url(recipe.id)),
+        )
+
+    def test_recipe_create_budget(self):
+        """Test creating a recipe does not query per tag or ingredient"""
+        budget = QUERY_BUDGETS['recipe-create']
+
+        for count in (1, 10):
+            existing = Tag.objects.create(user=self.user, name=f'Old {count}')
+            payload = {
+                'title': f'Recipe with {count} tags',
+                'time_minutes': 10,
+                'price': Decimal('5.00'),
+                'tags': [{'name': existing.name}] + [
+                    {'name': f'Tag {count}-{i}'} for i in range(count)
+                ],
+                'ingredients': [
+                    {'name': f'Ingredient {i}'} for i in range(count)
+                ],
+            }
+            with self.assertNumQueries(budget):
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_recipe_update_budget(self):
+        """Test updating a recipe does not query per tag or ingredient"""
+        self.assertQueryBudget(
+            'recipe-update',
+            lambda recipe: self.client.patch(
+                detail_url(recipe.id),
+                {'title': 'Updated'},
+            ),
+        )
+
+    def test_recipe_bulk_budget(self):
+        """Test bulk writes do not query per recipe, tag or ingredient"""
+        budget = QUERY_BUDGETS['recipe-bulk']
+
+        for count in (1, 10):
+            self.create_recipes(2 * count)
+            recipes = Recipe.objects.order_by('-id')[:2 * count]
+            payload = {
+                'create': [
+                    {
+                        'title': f'Bulk recipe {i}',
+                        'time_minutes': 10,
+                        'price': Decimal('5.00'),
+                        'tags': [{'name': f'Bulk tag {count}-{i}'}],
+                        'ingredients': [{'name': f'Ingredient {count}-0'}],
+                    }
+                    for i in range(count)
+                ],
+                'update': [
+                    {'id': recipe.id, 'tags': [{'name': 'Updated'}]}
+                    for recipe in recipes[:count]
+                ],
+                'delete': [recipe.id for recipe in recipes[count:]],
+            }
+            with self.assertNumQueries(budget):
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tag_list_budget(self):
+        """Test listing tags is a single query"""
+        self.assertQueryBudget(
+            'tag-list',
+            lambda recipe: self.client.get(
+                TAGS_URL,
+                {'assigned_only': 1},
+            ),
+        )
+
+    def test_ingredient_list_budget(self):
+        """Test listing ingredients is a single query"""
+        self.assertQueryBudget(
+            'ingredient-list',
+            lambda recipe: self.client.get(
+                INGREDIENTS_URL,
+                {'assigned_only': 1},
+            ),
+        )
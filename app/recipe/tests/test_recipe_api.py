@@ -9,7 +9,14 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.core.files.storage import default_storage
+from django.test import (
+    override_settings,
+    TestCase,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -21,6 +28,7 @@ from core.models import (
     Ingredient,
 )
 
+from recipe import images
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 
@@ -90,7 +98,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipes_limited_to_user(self):
         """Test retrieving recipes for user"""
@@ -106,7 +114,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.filter(user=self.user)
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test viewing a recipe detail"""
@@ -248,6 +256,40 @@ class PrivateRecipeApiTests(TestCase):
         for tag in payload['tags']:
             self.assertIn(Tag.objects.get(name=tag['name']), tags)
 
+    def test_create_recipe_reuses_existing_tags(self):
+        """Test creating a recipe links tags the user already has"""
+        tag_indian = Tag.objects.create(user=self.user, name='Indian')
+        payload = {
+            'title': 'Pongal',
+            'time_minutes': 60,
+            'price': Decimal('4.50'),
+            'tags': [{'name': 'Indian'}, {'name': 'Breakfast'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 2)
+        self.assertIn(tag_indian, recipe.tags.all())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_create_recipe_with_repeated_names(self):
+        """Test names repeated in a payload are only created once"""
+        payload = {
+            'title': 'Guacamole',
+            'time_minutes': 10,
+            'price': Decimal('3.00'),
+            'tags': [{'name': 'Dip'}, {'name': 'Dip'}],
+            'ingredients': [{'name': 'Avocado'}, {'name': 'Avocado'}],
+        }
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 1)
+        self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_on_update(self):
         """Test creating a tag on recipe update"""
         recipe = create_recipe(user=self.user)
@@ -282,6 +324,53 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(tag2, recipe.tags.all())
         self.assertNotIn(tag1, recipe.tags.all())
 
+    def test_update_recipe_same_tags_no_writes(self):
+        """Test sending back the same tags does not touch the links"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Tofu')
+        )
+
+        payload = {
+            'tags': [{'name': 'Vegan'}],
+            'ingredients': [{'name': 'Tofu'}],
+        }
+        url = detail_url(recipe.id)
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        m2m_writes = [
+            query['sql'] for query in ctx.captured_queries
+            if query['sql'].startswith(('INSERT', 'DELETE'))
+            and 'core_recipe_' in query['sql']
+        ]
+        self.assertEqual(m2m_writes, [])
+
+    def test_update_recipe_tags_keeps_unchanged_links(self):
+        """Test only the changed tag links are inserted or deleted"""
+        recipe = create_recipe(user=self.user)
+        tag_vegan = Tag.objects.create(user=self.user, name='Vegan')
+        tag_lunch = Tag.objects.create(user=self.user, name='Lunch')
+        recipe.tags.add(tag_vegan, tag_lunch)
+        kept_link = Recipe.tags.through.objects.get(
+            recipe=recipe, tag=tag_vegan
+        )
+
+        payload = {'tags': [{'name': 'Vegan'}, {'name': 'Dinner'}]}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Vegan', 'Dinner'},
+        )
+        self.assertTrue(
+            Recipe.tags.through.objects.filter(id=kept_link.id).exists()
+        )
+
     def test_clear_recipe_tags(self):
         """Test clearing tags on recipe update"""
         tag1 = Tag.objects.create(user=self.user, name='Vegan')
@@ -375,6 +464,19 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(ingredient2, recipe.ingredients.all())
         self.assertNotIn(ingredient1, recipe.ingredients.all())
 
+    def test_partial_update_keeps_ingredients(self):
+        """Test patching other fields leaves ingredients unchanged"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(ingredient)
+
+        payload = {'title': 'Updated recipe'}
+        url = detail_url(recipe.id)
+        res = self.client.patch(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(ingredient, recipe.ingredients.all())
+
     def test_clear_recipe_ingredients(self):
         """Test clearing ingredients on recipe update"""
         ingredient1 = Ingredient.objects.create(user=self.user, name='Salt')
@@ -414,9 +516,9 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -440,9 +542,186 @@ class PrivateRecipeApiTests(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipes_no_duplicates(self):
+        """Test recipes matching several filter IDs are returned once"""
+        recipe = create_recipe(user=self.user, title='Thai vegetable curry')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        recipe.tags.add(tag1, tag2)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'}
+            )
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+        self.assertFalse(any(
+            'DISTINCT' in query['sql'] for query in queries.captured_queries
+        ))
+
+    def test_filter_recipes_match_all(self):
+        """Test match=all returns only recipes with every given tag"""
+        recipe1 = create_recipe(user=self.user, title='Thai vegetable curry')
+        recipe2 = create_recipe(user=self.user, title='Aubergine with tahini')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_match_all_tags_and_ingredients(self):
+        """Test match=all applies to tags and ingredients separately"""
+        recipe1 = create_recipe(user=self.user, title='Thai vegetable curry')
+        recipe2 = create_recipe(user=self.user, title='Aubergine with tahini')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Chili')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Lime')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2.tags.add(tag)
+        recipe2.ingredients.add(ingredient1)
+
+        params = {
+            'tags': f'{tag.id}',
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+            'match': 'all',
+        }
+        res = self.client.get(RECIPES_URL, params)
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(ids, [recipe1.id])
+
+    def test_filter_recipes_invalid_match(self):
+        """Test an unknown match mode is rejected"""
+        res = self.client.get(RECIPES_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sparse_fields(self):
+        """Test only the requested fields are loaded and returned"""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(
+                RECIPES_URL, {'fields': 'id,title,time_minutes'}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(res.data['results'][0]), ['id', 'title', 'time_minutes']
+        )
+        recipe_queries = [
+            query['sql'] for query in ctx.captured_queries
+            if 'core_recipe' in query['sql']
+        ]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertNotIn('"price"', recipe_queries[0])
+
+    def test_list_tags_as_ids(self):
+        """Test relations left out of expand are returned as ID lists"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {'expand': 'ingredients'})
+
+        result = res.data['results'][0]
+        self.assertEqual(result['tags'], [tag.id])
+        self.assertEqual(
+            result['ingredients'], [{'id': ingredient.id, 'name': 'Salt'}]
+        )
+
+    def test_detail_sparse_fields(self):
+        """Test the detail view supports fields and expand"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        res = self.client.get(
+            detail_url(recipe.id), {'fields': 'description,tags', 'expand': ''}
+        )
+
+        self.assertEqual(res.data, {
+            'description': recipe.description,
+            'tags': [tag.id],
+        })
+
+    def test_unknown_sparse_field(self):
+        """Test requesting an unknown field is rejected"""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes_ranked(self):
+        """Test searching returns matches with title matches first"""
+        in_description = create_recipe(
+            user=self.user,
+            title='Weeknight dinner',
+            description='A quick curry with chickpeas',
+        )
+        in_title = create_recipe(
+            user=self.user,
+            title='Chickpea curry',
+            description='Spicy and filling',
+        )
+        create_recipe(user=self.user, title='Pancakes', description='Sweet')
+
+        res = self.client.get(RECIPES_URL, {'search': 'curry'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [in_title.id, in_description.id],
+        )
+
+    def test_search_combined_with_tags(self):
+        """Test searching only returns recipes matching the tag filter"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe1 = create_recipe(user=self.user, title='Lentil soup')
+        recipe1.tags.add(tag)
+        create_recipe(user=self.user, title='Chicken soup')
+
+        res = self.client.get(
+            RECIPES_URL, {'search': 'soups', 'tags': f'{tag.id}'}
+        )
+
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [recipe1.id],
+        )
+
+    def test_search_follows_title_updates(self):
+        """Test updated titles are searchable straight away"""
+        recipe = create_recipe(user=self.user, title='Toast')
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Banana bread'})
+        res = self.client.get(RECIPES_URL, {'search': 'banana'})
+
+        self.assertEqual(res.data['results'][0]['id'], recipe.id)
+
+    def test_search_uses_index(self):
+        """Test the search filter can be answered from the GIN index"""
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = Recipe.objects.filter(
+            search_vector=SearchQuery('curry', config='english')
+        ).explain()
+
+        self.assertIn('recipe_search_idx', plan)
 
 
 class ImageUploadTests(TestCase):
@@ -458,6 +737,8 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
+        images.delete_derivatives(self.recipe.image_derivatives)
         self.recipe.image.delete()
 
     def test_upload_image_to_recipe(self):
@@ -476,6 +757,61 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_upload_image_generates_derivatives(self):
+        """Test resized copies are created once the upload commits"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (1000, 500))
+            img.save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    url, {'image': image_file}, format='multipart'
+                )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        derivatives = self.recipe.image_derivatives
+        self.assertEqual(set(derivatives), {'thumbnail', 'medium'})
+        thumbnail = derivatives['thumbnail']['webp']
+        with Image.open(default_storage.path(thumbnail)) as img:
+            self.assertEqual(img.format, 'WEBP')
+            self.assertEqual(img.size, (200, 100))
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        self.assertTrue(
+            res.data['image_derivatives']['thumbnail']['jpeg'].endswith(
+                derivatives['thumbnail']['jpeg']
+            )
+        )
+
+    @override_settings(RECIPE_IMAGE_WORKERS=0)
+    def test_stale_save_keeps_derivatives(self):
+        """Test saving a recipe loaded before the derivatives were made"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (1000, 500)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(
+                    url, {'image': image_file}, format='multipart'
+                )
+        stale = Recipe.objects.get(id=self.recipe.id)
+        for callback in callbacks:
+            callback()
+
+        stale.title = 'Patched'
+        stale.save()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Patched')
+        self.assertEqual(
+            set(self.recipe.image_derivatives), {'thumbnail', 'medium'}
+        )
+        self.assertEqual(self.recipe.version, 4)
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
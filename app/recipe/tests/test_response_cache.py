@@ -0,0 +1,178 @@
+"""
+Tests for the recipe API response cache
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Recipe,
+    Tag,
+)
+from recipe.cache import (
+    ResponseCache,
+    response_cache,
+)
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+CACHE_STATS_URL = reverse('cache-stats')
+
+
+def detail_url(recipe_id):
+    """Return recipe detail URL"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ResponseCacheTests(TestCase):
+    """Test caching recipe API responses"""
+
+    def setUp(self):
+        response_cache.cache.clear()
+        response_cache.reset_stats()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def test_repeated_list_cached(self):
+        """Test a repeated list request skips the query and serializer"""
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data, first.data)
+        self.assertEqual(
+            response_cache.stats(),
+            {'hits': 1, 'misses': 1, 'hit_ratio': 0.5},
+        )
+
+    def test_repeated_detail_cached(self):
+        """Test a repeated detail request is answered from the cache"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+        self.assertEqual(res.data['id'], self.recipe.id)
+
+    def test_equivalent_params_share_entry(self):
+        """Test reordered and repeated filter IDs hit the same entry"""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        res = self.client.get(
+            RECIPES_URL, {'tags': f'{tag2.id},{tag1.id},{tag2.id}'}
+        )
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_flag_params_normalized(self):
+        """Test equivalent assigned_only values hit the same entry"""
+        self.client.get(TAGS_URL, {'assigned_only': '1'})
+
+        res = self.client.get(TAGS_URL, {'assigned_only': '01'})
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_invalidated_by_link_change(self):
+        """Test linking a tag outside the API invalidates the list"""
+        self.client.get(RECIPES_URL)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        tag.recipe_set.add(self.recipe)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+    def test_invalidated_by_tag_rename(self):
+        """Test renaming a tag invalidates the recipes showing it"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(tag)
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+
+        tag.name = 'Plant based'
+        tag.save()
+        res = self.client.get(url)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['tags'][0]['name'], 'Plant based')
+
+    def test_not_shared_between_users(self):
+        """Test users never get each other's cached responses"""
+        self.client.get(RECIPES_URL)
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+    def test_errors_not_cached(self):
+        """Test failed requests are not cached"""
+        self.client.get(RECIPES_URL, {'match': 'some'})
+
+        res = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response_cache.stats()['hits'], 0)
+
+    def test_disabled(self):
+        """Test a zero timeout disables the cache"""
+        cache = ResponseCache(alias='default', timeout=0)
+
+        self.assertFalse(cache.enabled)
+
+    def test_stats_reported_to_staff(self):
+        """Test staff can read the hit and miss counts"""
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+        staff_client = APIClient()
+        staff_client.force_authenticate(
+            get_user_model().objects.create_superuser(
+                email='admin@example.com',
+                password='testpass123',
+            )
+        )
+
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = staff_client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        stats = res.data['response_cache']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertTrue(stats['enabled'])
@@ -0,0 +1,94 @@
+"""
+Tests for the shopping list of recipes
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+)
+from recipe.cache import response_cache
+
+
+SHOPPING_LIST_URL = reverse('recipe:recipe-shopping-list')
+
+
+def create_recipe(user, *ingredients):
+    """Create and return a sample recipe with the ingredients"""
+    recipe = Recipe.objects.create(
+        user=user,
+        title='Sample recipe',
+        time_minutes=10,
+        price=Decimal('5.00'),
+    )
+    recipe.ingredients.add(*ingredients)
+
+    return recipe
+
+
+class ShoppingListApiTests(TestCase):
+    """Test merging the ingredients of recipes"""
+
+    def setUp(self):
+        response_cache.cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_ingredients_merged(self):
+        """Test each ingredient is listed once with its recipes"""
+        eggs, flour, milk = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Eggs', 'Flour', 'Milk')
+        )
+        pancakes = create_recipe(self.user, eggs, flour, milk)
+        omelette = create_recipe(self.user, eggs)
+        create_recipe(self.user, milk)
+        params = {'recipes': f'{omelette.id},{pancakes.id}'}
+
+        # The collection version, then the grouped query.
+        with self.assertNumQueries(2):
+            res = self.client.get(SHOPPING_LIST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {
+                'id': eggs.id,
+                'name': 'Eggs',
+                'recipes': sorted([pancakes.id, omelette.id]),
+            },
+            {'id': flour.id, 'name': 'Flour', 'recipes': [pancakes.id]},
+            {'id': milk.id, 'name': 'Milk', 'recipes': [pancakes.id]},
+        ])
+
+    def test_other_users_recipes_excluded(self):
+        """Test the recipes of other users are ignored"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        recipe = create_recipe(
+            other_user, Ingredient.objects.create(user=other_user, name='Salt')
+        )
+
+        res = self.client.get(SHOPPING_LIST_URL, {'recipes': recipe.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_invalid_recipe_ids(self):
+        """Test missing or malformed recipe IDs are rejected"""
+        for params in ({}, {'recipes': '1,x'}):
+            res = self.client.get(SHOPPING_LIST_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,163 @@
+"""
+Tests for similar recipe recommendations
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+)
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Ingredient,
+    Recipe,
+    Tag,
+)
+from recipe.cache import response_cache
+from recipe.similarity import (
+    jaccard,
+    MinHasher,
+    similarity_cache,
+)
+
+
+def similar_url(recipe_id):
+    """Create and return a similar recipes URL"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class MinHasherTests(SimpleTestCase):
+    """Test MinHash signatures"""
+
+    def test_signatures_estimate_jaccard(self):
+        """Test matching signature slots approximate Jaccard similarity"""
+        hasher = MinHasher(256)
+        first = set(range(0, 100))
+        second = set(range(50, 150))
+
+        signatures = hasher.signatures([first, second, set(), first])
+
+        self.assertTrue((signatures[:, 0] == signatures[:, 3]).all())
+        estimate = (signatures[:, 0] == signatures[:, 1]).mean()
+        self.assertAlmostEqual(estimate, jaccard(first, second), delta=0.1)
+        self.assertFalse((signatures[:, 2] == signatures[:, 0]).any())
+
+
+class SimilarApiTests(TestCase):
+    """Test listing similar recipes"""
+
+    def setUp(self):
+        similarity_cache.clear()
+        response_cache.cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Quick', 'Dinner')
+        }
+        self.ingredients = {
+            name: Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Tofu', 'Rice')
+        }
+
+    def create_recipe(self, title, tags=(), ingredients=()):
+        """Create and return a recipe with the named tags and ingredients"""
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.tags.add(*(self.tags[name] for name in tags))
+        recipe.ingredients.add(
+            *(self.ingredients[name] for name in ingredients)
+        )
+
+        return recipe
+
+    def similar(self, recipe, **params):
+        """Return the titles and similarities of the similar recipes"""
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [(item['title'], item['similarity']) for item in res.data]
+
+    def test_similar_ranked(self):
+        """Test recipes are ranked by the tags and ingredients shared"""
+        recipe = self.create_recipe('Tofu bowl', ['Vegan', 'Quick'], ['Tofu'])
+        self.create_recipe('Tofu stir fry', ['Vegan', 'Quick'], ['Tofu'])
+        self.create_recipe('Rice', ['Vegan'], ['Rice'])
+        self.create_recipe('Steak', ['Dinner'])
+
+        self.assertEqual(self.similar(recipe), [
+            ('Tofu stir fry', 1.0),
+            ('Rice', 0.25),
+        ])
+        self.assertEqual(
+            self.similar(recipe, limit=1), [('Tofu stir fry', 1.0)]
+        )
+
+    def test_index_follows_changes(self):
+        """Test link changes and deletes are picked up"""
+        recipe = self.create_recipe('Tofu bowl', ['Vegan'], ['Tofu'])
+        stir_fry = self.create_recipe('Tofu stir fry', ['Vegan'])
+        steak = self.create_recipe('Steak', ['Dinner'])
+        self.assertEqual(self.similar(recipe), [('Tofu stir fry', 0.5)])
+
+        steak.tags.set([self.tags['Vegan']])
+        steak.ingredients.add(self.ingredients['Tofu'])
+        stir_fry.delete()
+
+        self.assertEqual(self.similar(recipe), [('Steak', 1.0)])
+
+    def test_deletes_masked_beside_featureless_recipes(self):
+        """Test deleted recipes are dropped when others have no features"""
+        recipe = self.create_recipe('Tofu bowl', ['Vegan'])
+        stir_fry = self.create_recipe('Tofu stir fry', ['Vegan'])
+        curry = self.create_recipe('Tofu curry', ['Vegan'])
+        for i in range(3):
+            self.create_recipe(f'Plain {i}')
+        index = similarity_cache.get_index(self.user.id, 1)
+
+        stir_fry.delete()
+        index = similarity_cache.get_index(self.user.id, 2)
+
+        self.assertEqual(index.candidates(recipe.id, 10), [curry.id])
+
+    def test_other_users_recipes(self):
+        """Test other users' recipes are neither listed nor looked up"""
+        other_user = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        recipe = self.create_recipe('Tofu bowl', ['Vegan'])
+        Recipe.objects.create(
+            user=other_user,
+            title='Tofu bowl',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        ).tags.add(Tag.objects.create(user=other_user, name='Vegan'))
+
+        self.assertEqual(self.similar(recipe), [])
+
+        self.client.force_authenticate(other_user)
+        res = self.client.get(similar_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_limit(self):
+        """Test limits out of range are rejected"""
+        recipe = self.create_recipe('Tofu bowl')
+
+        res = self.client.get(similar_url(recipe.id), {'limit': 1000})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -61,7 +61,7 @@ class PrivateTagsApiTests(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """Test that tags returned are for the authenticated user."""
@@ -72,9 +72,9 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
-        self.assertEqual(res.data[0]['id'], tag.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['id'], tag.id)
 
     def test_update_tag(self):
         """Test updating a tag."""
@@ -88,6 +88,20 @@ class PrivateTagsApiTests(TestCase):
 
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name(self):
+        """Test renaming a tag to an existing name fails."""
+        Tag.objects.create(user=self.user, name='Spicy')
+        tag = Tag.objects.create(user=self.user, name='Fruity')
+
+        payload = {'name': 'Spicy'}
+        url = detail_url(tag.id)
+        res = self.client.patch(url, payload)
+
+        tag.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(tag.name, 'Fruity')
+
     def test_delete_tag(self):
         """Test deleting a tag."""
         tag = Tag.objects.create(user=self.user, name='Fruity')
@@ -119,8 +133,8 @@ class PrivateTagsApiTests(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_filter_tags_assigned_unique(self):
         """Test filtering tags by assigned returns unique items."""
@@ -146,4 +160,33 @@ class PrivateTagsApiTests(TestCase):
             {'assigned_only': 1},
         )
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_order_tags_by_usage(self):
+        """Test ordering tags with the most used first."""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Breakfast', 'Lunch', 'Dinner')
+        ]
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('3.00'),
+            )
+            recipe.tags.add(*tags[i:])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ['Dinner', 'Lunch', 'Breakfast'],
+        )
+
+    def test_order_tags_invalid(self):
+        """Test unknown orderings are rejected."""
+        res = self.client.get(TAGS_URL, {'ordering': 'created'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
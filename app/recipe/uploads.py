@@ -0,0 +1,166 @@
+"""
+Chunked, resumable uploads of recipe images
+"""
+import os
+import re
+import time
+import uuid
+from datetime import timedelta
+
+from PIL import Image
+
+from django.core.files import File
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions
+
+from core.models import RecipeImageUpload
+
+
+# Bytes read from the request stream at a time, which bounds the memory
+# used per upload regardless of chunk or file size.
+BLOCK_SIZE = 64 * 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+# Leading bytes of the image formats accepted for recipes.
+IMAGE_SIGNATURES = (
+    b'\xff\xd8\xff',
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a',
+    b'GIF89a',
+)
+SIGNATURE_LENGTH = 12
+
+
+class UploadConflict(exceptions.APIException):
+    status_code = 409
+    default_detail = _('Chunk does not start at the current upload offset.')
+    default_code = 'upload_conflict'
+
+
+class _ReceivedFile(File):
+    """Received upload that storage can move into place instead of copy"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def restart_if_lost(upload):
+    """Restart an upload whose received bytes are no longer on disk"""
+    # The offset is saved with the next chunk, so a client resuming from
+    # the old offset is told to start over.
+    if upload.offset and not os.path.exists(upload.partial_path):
+        upload.offset = 0
+
+
+def parse_content_range(header, upload, max_chunk_size):
+    """Return the (start, length) of a chunk from its Content-Range"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise exceptions.ParseError(_('Invalid Content-Range header.'))
+
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+
+    if total != upload.size or end >= total or length <= 0:
+        raise exceptions.ParseError(_('Content-Range does not match upload.'))
+    if length > max_chunk_size:
+        raise exceptions.ValidationError(_('Chunk is too large.'))
+    if start != upload.offset:
+        raise UploadConflict()
+
+    return start, length
+
+
+def write_chunk(upload, stream, start, length):
+    """Stream a chunk from the request to the partial file"""
+    if stream is None:
+        raise exceptions.ParseError(_('Chunk ended early.'))
+
+    os.makedirs(os.path.dirname(upload.partial_path), exist_ok=True)
+    mode = 'r+b' if start else 'wb'
+    remaining = length
+
+    with open(upload.partial_path, mode) as partial:
+        partial.seek(start)
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                raise exceptions.ParseError(_('Chunk ended early.'))
+            partial.write(block)
+            remaining -= len(block)
+        partial.truncate()
+
+    if start == 0:
+        validate_signature(upload)
+
+
+def validate_signature(upload):
+    """Check the first bytes of the upload are a supported image format"""
+    with open(upload.partial_path, 'rb') as partial:
+        head = partial.read(SIGNATURE_LENGTH)
+
+    is_webp = head[:4] == b'RIFF' and head[8:12] == b'WEBP'
+    if not is_webp and not head.startswith(IMAGE_SIGNATURES):
+        raise exceptions.ValidationError(_('Upload is not a valid image.'))
+
+
+def verify_image(upload):
+    """Check the complete upload decodes as an image"""
+    try:
+        with Image.open(upload.partial_path) as image:
+            image.verify()
+    except Exception:
+        raise exceptions.ValidationError(_('Upload is not a valid image.'))
+
+
+def attach_image(recipe, upload):
+    """Move the complete upload into storage as the recipe image"""
+    with _ReceivedFile(open(upload.partial_path, 'rb')) as received:
+        recipe.image.save(upload.filename, received, save=False)
+
+    recipe.image_derivatives = {}
+    recipe.save(update_fields=['image', 'image_derivatives'])
+
+
+def expired_uploads(max_age):
+    """Return the uploads started more than max_age seconds ago"""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+
+    return RecipeImageUpload.objects.filter(created__lt=cutoff)
+
+
+def orphaned_partial_files(max_age):
+    """Return the partial files older than max_age without an upload
+
+    Deleting a recipe drops its uploads in the database cascade, which
+    leaves their partial files behind.
+    """
+    directory = RecipeImageUpload.partial_directory()
+    if not os.path.isdir(directory):
+        return []
+
+    cutoff = time.time() - max_age
+    paths = {}
+    for entry in os.scandir(directory):
+        name, ext = os.path.splitext(entry.name)
+        if ext == '.part' and entry.stat().st_mtime < cutoff:
+            try:
+                paths[uuid.UUID(name)] = entry.path
+            except ValueError:
+                continue
+
+    existing = set(RecipeImageUpload.objects.filter(
+        id__in=list(paths)
+    ).values_list('id', flat=True))
+
+    return [path for pk, path in paths.items() if pk not in existing]
+
+
+def discard(upload):
+    """Delete an upload and any bytes received for it"""
+    if os.path.exists(upload.partial_path):
+        os.remove(upload.partial_path)
+    upload.delete()
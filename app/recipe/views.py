@@ -1,6 +1,27 @@
 """
 Views for the recipe app
 """
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+)
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+)
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext as _
+
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -13,16 +34,45 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 from core.models import (
+    CollectionVersion,
     Recipe,
     Tag,
     Ingredient,
 )
-from recipe import serializers
+from recipe import (
+    autocomplete,
+    export,
+    facets,
+    images,
+    serializers,
+    similarity,
+    uploads,
+)
+from recipe.conditional import ConditionalGetMixin
+from user.authentication import CachedTokenAuthentication
+
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return',
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        description=(
+            'Comma separated list of tags and ingredients to return as '
+            'objects, the others are returned as lists of IDs. All are '
+            'returned as objects when omitted'
+        ),
+    ),
+]
 
 
 @extend_schema_view(
@@ -38,35 +88,177 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of IDs to filter by',
             ),
-        ]
-    )
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Require any (default) or all of the given IDs',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Search titles and descriptions, best first',
+            ),
+        ] + SPARSE_FIELDS_PARAMETERS
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
-    queryset = Recipe.objects.all()
+    queryset = Recipe.objects.defer('search_vector')
     serializer_class = serializers.RecipeDetailSerializer
+    ordering = ('-id',)
+    version_collection = CollectionVersion.RECIPES
+    # Must match the configuration of the search_vector trigger.
+    search_config = 'english'
 
     def _params_to_ints(self, qs):
         """Convert a list of string IDs to a list of integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
-    def get_queryset(self):
-        """Retrieve the recipes for the authenticated user"""
+    def _filter_by_related(self, queryset, field_name, ids, match):
+        """Filter recipes linked to any or all of the given related IDs"""
+        field = Recipe._meta.get_field(field_name)
+        links = field.remote_field.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            **{f'{field.m2m_reverse_field_name()}_id__in': ids},
+        )
+
+        if match == 'all':
+            matched = links.order_by().values('recipe_id').annotate(
+                matched=Count('*')
+            ).values('matched')
+            return queryset.alias(
+                **{f'matched_{field_name}': Subquery(matched)}
+            ).filter(**{f'matched_{field_name}': len(ids)})
+
+        return queryset.filter(Exists(links))
+
+    def _filter_recipes(self, queryset):
+        """Apply the tags and ingredients filters from the query params"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
+        match = self.request.query_params.get('match', 'any')
+
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': _('Must be "any" or "all".')})
 
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = set(self._params_to_ints(tags))
+            queryset = self._filter_by_related(
+                queryset, 'tags', tag_ids, match
+            )
 
         if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            ingredient_ids = set(self._params_to_ints(ingredients))
+            queryset = self._filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+
+        return queryset
+
+    def get_queryset(self):
+        """Retrieve the recipes for the authenticated user"""
+        search = self.request.query_params.get('search')
+        queryset = self._filter_recipes(self.queryset)
+        ordering = self.ordering
+
+        if search:
+            query = SearchQuery(
+                search,
+                config=self.search_config,
+                search_type='websearch',
+            )
+            # Rank as double precision so cursors round-trip it exactly.
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+            )
+            ordering = ('-rank',) + ordering
+
+        queryset = queryset.filter(
+            user=self.request.user
+        ).order_by(*ordering)
+
+        if self.action in ('list', 'retrieve'):
+            queryset = self._select_fields(queryset)
+
+        return queryset
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+    def get_field_selection(self):
+        """Return the requested fields and relations to expand, if any"""
+        if hasattr(self, '_field_selection'):
+            return self._field_selection
+
+        params = self.request.query_params
+        serializer_class = self.get_serializer_class()
+        fields = params.get('fields')
+        expand = params.get('expand')
+
+        if fields is not None:
+            fields = [name for name in fields.split(',') if name]
+            unknown = set(fields) - set(serializer_class().fields)
+            if unknown:
+                raise ValidationError({'fields': _('Unknown fields: %s.') % (
+                    ', '.join(sorted(unknown))
+                )})
+
+        if expand is not None:
+            expand = {name for name in expand.split(',') if name}
+            unknown = expand - set(serializer_class.id_list_sources)
+            if unknown:
+                raise ValidationError({'expand': _('Unknown fields: %s.') % (
+                    ', '.join(sorted(unknown))
+                )})
+
+        self._field_selection = (fields, expand)
+        return self._field_selection
+
+    def _select_fields(self, queryset):
+        """Load only the columns and relations the response includes"""
+        fields, expand = self.get_field_selection()
+        serializer_class = self.get_serializer_class()
+
+        if fields is not None:
+            columns = {field.name for field in Recipe._meta.concrete_fields}
+            queryset = queryset.only(
+                'id', *(name for name in fields if name in columns)
+            )
+
+        for name, source in serializer_class.id_list_sources.items():
+            if fields is not None and name not in fields:
+                continue
+
+            if expand is None or name in expand:
+                queryset = queryset.prefetch_related(name)
+            else:
+                # Read the IDs from the link table in the same query.
+                field = Recipe._meta.get_field(name)
+                column = f'{field.m2m_reverse_field_name()}_id'
+                ids = field.remote_field.through.objects.filter(
+                    recipe_id=OuterRef('pk')
+                ).order_by(column).values(column)
+                queryset = queryset.annotate(**{source: ArraySubquery(ids)})
+
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        """Return the serializer, limited to the requested fields"""
+        if self.action in ('list', 'retrieve'):
+            fields, expand = self.get_field_selection()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+
+        return super().get_serializer(*args, **kwargs)
+
+    def get_object_version(self):
+        """Return the version and modification time of the recipe"""
+        try:
+            return Recipe.objects.filter(
+                user=self.request.user, pk=self.kwargs['pk']
+            ).values_list('version', 'modified').first()
+        except (TypeError, ValueError):
+            return None
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -74,6 +266,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action in ('image_uploads', 'image_upload_chunk'):
+            return serializers.RecipeImageUploadSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarRecipeSerializer
 
         return self.serializer_class
 
@@ -81,6 +279,191 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'file_format',
+                OpenApiTypes.STR, enum=list(export.FORMATS),
+                description='Export as JSON lines (default) or CSV',
+            ),
+        ],
+        responses={
+            (200, media_type): OpenApiTypes.STR
+            for media_type, _ext, _lines in export.FORMATS.values()
+        },
+    )
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream all of the user's recipes as JSON lines or CSV"""
+        file_format = request.query_params.get('file_format', 'ndjson')
+        if file_format not in export.FORMATS:
+            raise ValidationError({'file_format': _('Must be one of: %s.') % (
+                ', '.join(export.FORMATS)
+            )})
+
+        media_type, extension, lines = export.FORMATS[file_format]
+        rows = export.iter_rows(
+            self.get_queryset(),
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            settings.RECIPE_EXPORT_CHUNK_SIZE,
+        )
+        response = StreamingHttpResponse(lines(rows), content_type=media_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{extension}"'
+        )
+        # Pass rows through the proxy as they are produced.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+    @extend_schema(responses=serializers.RecipeBulkResultSerializer)
+    @action(methods=['POST'], detail=False)
+    def bulk(self, request):
+        """Create, update and delete many recipes in one transaction"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+
+        return Response(
+            serializers.RecipeBulkResultSerializer(result).data,
+            status=status.HTTP_200_OK,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name,
+                OpenApiTypes.STR,
+                description=f'Filter as for the recipe list, by {name}',
+            )
+            for name in ('tags', 'ingredients', 'match', 'search')
+        ],
+        responses=serializers.RecipeFacetsSerializer,
+    )
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def facets(self, request):
+        """Count the filtered recipes by tag, ingredient, time and price"""
+        return self.conditional_response(
+            self.get_list_version(), self._facets, request
+        )
+
+    def _facets(self, request):
+        """Return the facet counts of the filtered recipes"""
+        return Response(serializers.RecipeFacetsSerializer(
+            facets.facet_counts(self.get_queryset())
+        ).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'recipes',
+                OpenApiTypes.STR, required=True,
+                description='Comma separated list of recipe IDs to shop for',
+            ),
+        ],
+        responses=serializers.ShoppingListItemSerializer(many=True),
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='shopping-list',
+        pagination_class=None,
+    )
+    def shopping_list(self, request):
+        """List the ingredients of the given recipes once each"""
+        return self.conditional_response(
+            self.get_list_version(), self._shopping_list, request
+        )
+
+    def _shopping_list(self, request):
+        """Return the ingredients and the recipes each appears in"""
+        try:
+            recipe_ids = set(self._params_to_ints(
+                request.query_params.get('recipes', '')
+            ))
+        except ValueError:
+            raise ValidationError({
+                'recipes': _('Must be a comma separated list of IDs.'),
+            })
+
+        # One grouped query over the link table, the ingredient join also
+        # drops other users' recipes as ingredients belong to one user.
+        items = Recipe.ingredients.through.objects.filter(
+            recipe_id__in=recipe_ids,
+            ingredient__user=request.user,
+        ).values(
+            'ingredient_id', 'ingredient__name',
+        ).annotate(
+            recipes=ArrayAgg('recipe_id', ordering='recipe_id'),
+        ).order_by('ingredient__name', 'ingredient_id')
+
+        return Response(serializers.ShoppingListItemSerializer(
+            items, many=True
+        ).data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description=(
+                    'Number of recipes, 10 by default and at most '
+                    f'{settings.SIMILARITY_MAX_LIMIT}'
+                ),
+            ),
+        ],
+        responses=serializers.SimilarRecipeSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=True, pagination_class=None)
+    def similar(self, request, pk=None):
+        """List the recipes sharing the most tags and ingredients"""
+        return self.conditional_response(
+            self.get_list_version(), self._similar, request
+        )
+
+    def _similar(self, request):
+        """Return the recipes most similar to the requested one"""
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.SIMILARITY_MAX_LIMIT:
+            raise ValidationError({'limit': _(
+                'Must be a number from 1 to %(max)d.'
+            ) % {'max': settings.SIMILARITY_MAX_LIMIT}})
+
+        recipe = self.get_object()
+        version, _modified = self.get_list_version()
+        index = similarity.similarity_cache.get_index(
+            request.user.pk, version
+        )
+        # MinHash only estimates similarity, so more candidates than needed
+        # are ranked again by their exact Jaccard similarity.
+        features = similarity.load_features(Recipe.objects.filter(
+            user=request.user,
+            pk__in=[recipe.pk, *index.candidates(recipe.pk, limit * 4)],
+        ))
+        target = features.pop(recipe.pk, set())
+        scores = {
+            pk: similarity.jaccard(target, other)
+            for pk, other in features.items()
+        }
+        best = sorted(
+            (pk for pk, score in scores.items() if score),
+            key=lambda pk: (-scores[pk], -pk),
+        )[:limit]
+
+        recipes = Recipe.objects.defer('search_vector').prefetch_related(
+            'tags', 'ingredients'
+        ).in_bulk(best)
+        ranked = []
+        for pk in best:
+            recipes[pk].similarity = scores[pk]
+            ranked.append(recipes[pk])
+
+        return Response(self.get_serializer(ranked, many=True).data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -91,7 +474,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            stale_derivatives = recipe.image_derivatives
+            serializer.save(image_derivatives={})
+            images.schedule_derivatives(recipe, stale_derivatives)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK,
@@ -102,6 +487,80 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def image_uploads(self, request, pk=None):
+        """Start a chunked image upload for a recipe"""
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(recipe=recipe)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        methods=['PUT'],
+        request={'application/octet-stream': OpenApiTypes.BINARY},
+        parameters=[
+            OpenApiParameter(
+                'Content-Range',
+                OpenApiTypes.STR,
+                OpenApiParameter.HEADER,
+                required=True,
+                description='Chunk position, as bytes <start>-<end>/<size>',
+            ),
+        ],
+    )
+    @action(
+        methods=['GET', 'PUT'],
+        detail=True,
+        url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]+)',
+    )
+    def image_upload_chunk(self, request, pk=None, upload_id=None):
+        """Return the progress of an image upload or send its next chunk"""
+        recipe = self.get_object()
+
+        if request.method == 'GET':
+            upload = get_object_or_404(recipe.image_uploads, id=upload_id)
+            uploads.restart_if_lost(upload)
+            return Response(self.get_serializer(upload).data)
+
+        with transaction.atomic():
+            upload = get_object_or_404(
+                recipe.image_uploads.select_for_update(), id=upload_id
+            )
+            uploads.restart_if_lost(upload)
+            start, length = uploads.parse_content_range(
+                request.headers.get('Content-Range'),
+                upload,
+                settings.RECIPE_IMAGE_CHUNK_SIZE,
+            )
+            uploads.write_chunk(upload, request.stream, start, length)
+            upload.offset = start + length
+            upload.save(update_fields=['offset'])
+
+        if upload.offset < upload.size:
+            return Response(
+                self.get_serializer(upload).data,
+                status=status.HTTP_202_ACCEPTED,
+            )
+
+        try:
+            uploads.verify_image(upload)
+        except ValidationError:
+            uploads.discard(upload)
+            raise
+
+        stale_derivatives = recipe.image_derivatives
+        uploads.attach_image(recipe, upload)
+        uploads.discard(upload)
+        images.schedule_derivatives(recipe, stale_derivatives)
+
+        serializer = serializers.RecipeImageSerializer(
+            recipe,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -110,31 +569,99 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes',
-            )
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR, enum=['name', 'usage'],
+                description='Order by name (default) or most used first',
+            ),
         ]
-    )
+    ),
+    autocomplete=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR, required=True,
+                description=(
+                    'Start or fragment of the name, matches starting with '
+                    'it come first'
+                ),
+            ),
+            OpenApiParameter(
+                'limit',
+                OpenApiTypes.INT,
+                description=(
+                    'Number of matches, most used first, 10 by default and '
+                    f'at most {settings.AUTOCOMPLETE_MAX_LIMIT}'
+                ),
+            ),
+        ]
+    ),
 )
 class BaseRecipeAttrViewSet(
+    ConditionalGetMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
 ):
     """Base viewset for user owned recipe attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    orderings = {
+        'name': ('-name', '-id'),
+        'usage': ('-usage_count', '-name', '-id'),
+    }
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
+        ordering = self.request.query_params.get('ordering', 'name')
         queryset = self.queryset
 
+        if ordering not in self.orderings:
+            raise ValidationError({
+                'ordering': _('Must be "name" or "usage".'),
+            })
+
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(usage_count__gt=0)
+
+        return queryset.filter(
+            user=self.request.user
+        ).order_by(*self.orderings[ordering])
+
+    @action(methods=['GET'], detail=False, pagination_class=None)
+    def autocomplete(self, request):
+        """Return the best matches for the start or a fragment of a name"""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            raise ValidationError({'q': _('This field is required.')})
+
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= settings.AUTOCOMPLETE_MAX_LIMIT:
+            raise ValidationError({'limit': _(
+                'Must be a number from 1 to %(max)d.'
+            ) % {'max': settings.AUTOCOMPLETE_MAX_LIMIT}})
+
+        version, _modified = CollectionVersion.objects.get_version(
+            request.user, self.version_collection
+        )
+        matches = autocomplete.complete(
+            self.queryset.filter(user=request.user),
+            (self.version_collection, request.user.pk),
+            version,
+            text,
+            limit,
+        )
+        serializer = self.get_serializer(matches, many=True)
 
-        return queryset.filter(user=self.request.user).order_by('-name').distinct()
+        return Response(serializer.data)
 
 
 class TagViewSet(
@@ -143,6 +670,7 @@ class TagViewSet(
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    version_collection = CollectionVersion.TAGS
 
 
 class IngredientViewSet(
@@ -151,3 +679,4 @@ class IngredientViewSet(
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    version_collection = CollectionVersion.INGREDIENTS
@@ -0,0 +1,172 @@
+"""
+Authentication for the user app
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """Bounded per-process LRU of tokens, backed by an optional shared cache.
+
+    With a shared cache, invalidating a token gives it a new generation
+    there, and every local hit checks the generation it was cached under,
+    so other workers stop using it on their next request.  Without one,
+    other workers keep a token until it expires after ``timeout`` seconds.
+
+    The shared cache only holds the token's user id and creation time, and
+    the user is loaded from the database when a worker first reads them.
+    """
+    key_prefix = 'auth-token:'
+    generation_prefix = 'auth-token-generation:'
+
+    def __init__(self, max_size, timeout, shared_cache_alias=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.shared_cache_alias = shared_cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared_cache(self):
+        """Return the shared cache backend, if one is configured"""
+        if self.shared_cache_alias:
+            return caches[self.shared_cache_alias]
+
+        return None
+
+    def generation(self, key):
+        """Return the current generation of a token, empty if never changed"""
+        if self.shared_cache is None:
+            return ''
+
+        return self.shared_cache.get(self.generation_prefix + key, '')
+
+    def get(self, key, generation=None):
+        """Return a copy of the cached token, or None
+
+        The generation is read from the shared cache unless given.
+        """
+        if generation is None:
+            generation = self.generation(key)
+        token = self._get_local(key, generation)
+
+        if token is None and self.shared_cache is not None:
+            entry = self.shared_cache.get(self.key_prefix + key)
+            if entry is not None and entry[0] == generation:
+                token = self._load(key, *entry[1:])
+                if token is not None:
+                    self._set_local(key, token, generation)
+
+        # Callers get their own copy so a request can't modify the user
+        # object other requests are served from.
+        return copy.deepcopy(token)
+
+    def set(self, key, token, generation=None):
+        """Cache a token in every tier, with its user in the local one
+
+        Pass the generation read before the token was loaded, so a token
+        invalidated meanwhile is not cached as current.
+        """
+        if generation is None:
+            generation = self.generation(key)
+        self._set_local(key, token, generation)
+
+        if self.shared_cache is not None:
+            self.shared_cache.set(
+                self.key_prefix + key,
+                (generation, token.user_id, token.created),
+                timeout=self.timeout,
+            )
+
+    def delete(self, *keys):
+        """Remove tokens from every tier, and renew their generations"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+        if self.shared_cache is not None:
+            # Outlives the entries cached under the previous generation.
+            self.shared_cache.set_many(
+                {self.generation_prefix + key: uuid.uuid4().hex
+                 for key in keys},
+                timeout=self.timeout,
+            )
+            self.shared_cache.delete_many(
+                [self.key_prefix + key for key in keys]
+            )
+
+    def clear(self):
+        """Remove every token from the local tier"""
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, key, user_id, created):
+        user = get_user_model()._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+
+        return Token(key=key, user=user, created=created)
+
+    def _get_local(self, key, generation):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            token, cached_generation, expires = entry
+            if expires <= time.monotonic() or cached_generation != generation:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return token
+
+    def _set_local(self, key, token, generation):
+        with self._lock:
+            self._entries[key] = (
+                token, generation, time.monotonic() + self.timeout
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    timeout=settings.TOKEN_CACHE_TIMEOUT,
+    shared_cache_alias=settings.TOKEN_CACHE_ALIAS,
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that skips the database for cached tokens"""
+    cache = token_cache
+
+    def authenticate_credentials(self, key):
+        generation = self.cache.generation(key)
+        token = self.cache.get(key, generation)
+
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            self.cache.set(key, token, generation)
+            return (user, token)
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        return (token.user, token)
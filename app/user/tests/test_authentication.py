@@ -0,0 +1,188 @@
+"""
+Tests for cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import (
+    exceptions,
+    status,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    token_cache,
+)
+
+ME_URL = reverse('user:me')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class TokenCacheTests(TestCase):
+    """Test the token cache tiers"""
+
+    def setUp(self):
+        self.user = create_user(email='test@example.com', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest token is dropped when the cache is full"""
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('a', self.token)
+        cache.set('b', self.token)
+        cache.get('a')
+        cache.set('c', self.token)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    @patch('user.authentication.time.monotonic')
+    def test_entries_expire(self, patched_monotonic):
+        """Test tokens are dropped after the timeout"""
+        cache = TokenCache(max_size=2, timeout=60)
+        patched_monotonic.return_value = 100
+        cache.set('a', self.token)
+
+        patched_monotonic.return_value = 161
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_cache_fills_local_tier(self):
+        """Test a token cached by another worker is found"""
+        other_worker = TokenCache(10, 60, shared_cache_alias='default')
+        worker = TokenCache(10, 60, shared_cache_alias='default')
+        other_worker.set(self.token.key, self.token)
+
+        with self.assertNumQueries(1):
+            cached = worker.get(self.token.key)
+        with self.assertNumQueries(0):
+            worker.get(self.token.key)
+
+        self.assertEqual(cached.user.email, self.user.email)
+        self.assertEqual(cached.created, self.token.created)
+        worker.delete(self.token.key)
+        self.assertIsNone(other_worker.shared_cache.get(
+            worker.key_prefix + self.token.key
+        ))
+
+    def test_shared_cache_holds_no_user(self):
+        """Test only the user id of a token is shared between workers"""
+        worker = TokenCache(10, 60, shared_cache_alias='default')
+        worker.set(self.token.key, self.token)
+
+        entry = worker.shared_cache.get(worker.key_prefix + self.token.key)
+
+        self.assertEqual(entry, (
+            worker.generation(self.token.key),
+            self.user.pk,
+            self.token.created,
+        ))
+
+    def test_shared_cache_user_deleted(self):
+        """Test a token shared for a deleted user is not served"""
+        other_worker = TokenCache(10, 60, shared_cache_alias='default')
+        worker = TokenCache(10, 60, shared_cache_alias='default')
+        other_worker.set(self.token.key, self.token)
+        get_user_model().objects.filter(pk=self.user.pk).delete()
+
+        self.assertIsNone(worker.get(self.token.key))
+
+    def test_invalidation_reaches_other_workers(self):
+        """Test a token deleted by one worker is dropped by the others"""
+        other_worker = TokenCache(10, 60, shared_cache_alias='default')
+        worker = TokenCache(10, 60, shared_cache_alias='default')
+        worker.set(self.token.key, self.token)
+        self.assertIsNotNone(worker.get(self.token.key))
+
+        other_worker.delete(self.token.key)
+
+        self.assertIsNone(worker.get(self.token.key))
+
+    def test_token_loaded_before_invalidation_not_cached(self):
+        """Test a token loaded before it was invalidated is not served"""
+        worker = TokenCache(10, 60, shared_cache_alias='default')
+        generation = worker.generation(self.token.key)
+
+        worker.delete(self.token.key)
+        worker.set(self.token.key, self.token, generation)
+
+        self.assertIsNone(worker.get(self.token.key))
+
+    def test_get_returns_copy(self):
+        """Test changes to a returned token don't leak into the cache"""
+        cache = TokenCache(max_size=2, timeout=60)
+        cache.set('a', self.token)
+
+        cache.get('a').user.name = 'Changed'
+
+        self.assertNotEqual(cache.get('a').user.name, 'Changed')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = create_user(email='test@example.com', password='pass123')
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_token_skips_database(self):
+        """Test a repeated lookup does not query the database"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_deleted_token_invalidated(self):
+        """Test a deleted token stops authenticating"""
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+
+        self.token.delete()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_invalidated(self):
+        """Test a deactivated user's token stops authenticating"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_changed_user_reloaded(self):
+        """Test a changed user is reloaded on the next request"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.name = 'New name'
+        self.user.save()
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user.name, 'New name')
+
+    def test_authenticate_request(self):
+        """Test endpoints accept a token in the Authorization header"""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
@@ -5,5 +5,19 @@ set -e
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+# Creates the table of a DatabaseCache, does nothing for other caches.
+python manage.py createcachetable
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# SERVER_MODE=asgi serves HTTP from uvicorn workers, where the request body
+# is read before a worker thread is taken, so slow uploads do not hold one.
+if [ "$SERVER_MODE" = "asgi" ]; then
+    # Each request runs in a new thread, so share pooled connections rather
+    # than leave one persistent connection behind per thread.
+    export DB_POOL_SIZE="${DB_POOL_SIZE:-${ASGI_MAX_CONCURRENT_REQUESTS:-10}}"
+    exec gunicorn app.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers "${SERVER_WORKERS:-4}" \
+        --bind :9000
+fi
+
+uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi